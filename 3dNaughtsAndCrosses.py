@@ -1,28 +1,40 @@
 import itertools
+import os
 
 import pygame
 import random
 import math
+import time
 from render import *
+from render2d import SideBySideView
+from profiler import FrameProfiler
 from UI import *
+from engine import Engine, Player
+from ai import ComputerPlayer, AlphaBetaPlayer
+from mcts import MCTSPlayer
+from bitboard import maxCells
+from symmetry import PositionCache
+import savegame
 
 keybinds = {"Up": pygame.K_e, "Down": pygame.K_q, "Forward": pygame.K_w, "Backward": pygame.K_s, "Left": pygame.K_a,
             "Right": pygame.K_d, "Place": pygame.K_SPACE, "Rotate_Right": pygame.K_RIGHT, "Rotate_Left": pygame.K_LEFT,
             "Rotate_Up": pygame.K_UP, "Rotate_Down": pygame.K_DOWN, "Reset_Camera": pygame.K_r, "Toggle_FPS": pygame.K_z,
             "Cam_Up": pygame.K_o, "Cam_Down": pygame.K_u, "Cam_Left": pygame.K_j, "Cam_Right": pygame.K_l,
             "Cam_Forward": pygame.K_i, "Cam_Backward": pygame.K_k, "Swap_View": pygame.K_c, "Toggle_Transparent_Cubes": pygame.K_t,
-            "Increase_Explosion": pygame.K_EQUALS, "Decrease_Explosion": pygame.K_MINUS, "Toggle_Focus": pygame.K_f, "Toggle_Cursor": pygame.K_h}
+            "Increase_Explosion": pygame.K_EQUALS, "Decrease_Explosion": pygame.K_MINUS, "Toggle_Focus": pygame.K_f, "Toggle_Cursor": pygame.K_h,
+            "Save": pygame.K_F5, "Load": pygame.K_F9, "Undo": pygame.K_BACKSPACE, "Redo": pygame.K_y,
+            "Cycle_Sorting": pygame.K_g, "Toggle_Profiler": pygame.K_p, "Record_Profile": pygame.K_F2}
 directions = {"Up": Vector3d(0, 1, 0), "Down": Vector3d(0, -1, 0), "Forward": Vector3d(0, 0, 1),
               "Backward": Vector3d(0, 0, -1), "Left": Vector3d(-1, 0, 0), "Right": Vector3d(1, 0, 0)}
 colours = {"background": (255, 255, 255, 255), "triButton": (100, 150, 255, 255), "text": (0, 0, 0, 255),
            "button": (200, 200, 200, 255)}
 
-pygame.init()
-pygame.key.set_repeat(350, 50)
 # infoObject = pygame.display.Info()
 windowX = 450  # math.ceil(infoObject.current_x*0.6)
 windowY = 450  # math.ceil(infoObject.current_h*0.5)
-screen = pygame.display.set_mode((windowX, windowY), pygame.RESIZABLE, 32)
+savePath = "savegame.3dnc"
+# frames recorded by the profiler are written here, as JSON if it ends in .json and CSV otherwise
+profilePath = "profile.csv"
 
 
 def reverseDictLookup(dictionary, value):
@@ -37,38 +49,27 @@ def reverseDictLookup(dictionary, value):
         return items
 
 
-class Player:
+class Match(Engine):
 
-    def __init__(self, colour=(0, 0, 0), name=""):
-        self.colour = colour
-        self.name = name
-
-
-class Match:
-
-    def __init__(self, x=3, y=3, z=3, explosion=1, players=[], wrapping=False, demo=False):
-        self.winningLine = None
-        self.winningDirection = None
+    def __init__(self, x=3, y=3, z=3, explosion=1, players=[], wrapping=False, demo=False, win_length=3,
+                 backend=None):
+        super().__init__(x, y, z, players, wrapping, win_length, backend)
         self.running = not demo
-        self.players = players
-        self.currentTurn = 0
-        self.x = x
-        self.y = y
-        self.z = z
-        self.grid = self.generateGrid(x, y, z)
         self.objects = []
         self.currentlySelected = Position3d(0, 0, 0)
-        self.winner = -1
-        self.wrapping = wrapping
         self.render3d = True
         self.zoom2d = 3
+        self.sideBySide = SideBySideView(self)
+        self.canvas2d = None
         self.lastDrag = None
         self.camera = Camera()
         self.explosion = explosion
         self.lod = 0
+        self.detail = DetailController(5)
         self.focus_centre = True
         self.solid_cubes = False
         self.draw_selected = True
+        self.computerReport = ""
         if demo:
             self.set_default_view()
             self.currentlySelected = Position3d(-1, -1, -1)
@@ -76,12 +77,22 @@ class Match:
             self.generatePlayerColours()
 
     def set_default_view(self):
+        self.camera.zoom = self.defaultZoom()
+        self.camera.move((0, -10), 0)
+
+    def defaultZoom(self):
         # calculates required zoom to display entire grid
         fov = self.camera.fov / 2
         zoom = math.log(math.tan(math.radians(fov)) * math.sqrt((self.x) ** 2 + (self.y * self.explosion) ** 2) + self.z / 2, self.camera.zoom_linearity)
-        zoom = math.ceil(zoom)
-        self.camera.zoom = zoom
-        self.camera.move((0, -10), 0)
+        return math.ceil(zoom)
+
+    def detailDistance(self):
+        """Returns the distance from the camera beyond which gridlines are drawn with less detail. From the default
+        view every gridline is closer than this, wherever the camera is focused, so the grid only loses detail when
+        zoomed out further. Never less than minDetailDistance."""
+        reach = self.camera.zoom_linearity ** self.defaultZoom()
+        diagonal = math.sqrt(self.x ** 2 + (self.y * self.explosion) ** 2 + self.z ** 2)
+        return max(minDetailDistance, reach + diagonal)
 
     def generatePlayerColours(self):
         # number of different shades required given 6 distinct colours
@@ -108,135 +119,57 @@ class Match:
                 ticks += 1
             i += 1
 
-    def generateGrid(self, x, y, z):
-        """Generates grid[x][y][z] filled with -1"""
-        temp = []
-        for i in range(x):
-            tempX = []
-            for j in range(y):
-                tempY = []
-                for k in range(z):
-                    tempY.append(-1)
-                tempX.append(tempY)
-            temp.append(tempX)
-        return temp
-
-    def generate2dGrid(self, x, y):
-        temp = []
-        for i in range(x):
-            tempX = []
-            for j in range(y):
-                tempX.append(-1)
-            temp.append(tempX)
-        return temp
-
-    def checkForWrap(self, position):
-        """Checks whether position is in bounds. If in bounds or self.wrapping == true, returns the new position
-        (modified to be in-bounds if necessary). Otherwise, returns None."""
-        if position.x > self.x - 1:
-            if self.wrapping:
-                position.x = 0
-            else:
-                return None
-        elif position.x < 0:
-            if self.wrapping:
-                position.x = self.x - 1
-            else:
-                return None
-
-        if position.y > self.y - 1:
-            if self.wrapping:
-                position.y = 0
-            else:
-                return None
-        elif position.y < 0:
-            if self.wrapping:
-                position.y = self.y - 1
-            else:
-                return None
-
-        if position.z > self.z - 1:
-            if self.wrapping:
-                position.z = 0
-            else:
-                return None
-        elif position.z < 0:
-            if self.wrapping:
-                position.z = self.z - 1
-            else:
-                return None
-
-        return position
-
-    def checkForWin(self, point_to_check, player):
-        """Checks whether the latest change results in a line. Returns line_found, points_in_line, direction"""
-        directions = [Position3d(0, 0, 1), Position3d(0, 1, 0), Position3d(1, 0, 0),
-                      Position3d(1, 0, 1), Position3d(0, 1, 1), Position3d(1, 1, 0), Position3d(1, 1, 1),
-                      Position3d(-1, 0, 1), Position3d(0, -1, 1), Position3d(-1, 1, 0),
-                      Position3d(1, 1, -1), Position3d(1, -1, 1), Position3d(-1, 1, 1)]
-
-        for direction in directions:
-            # clone since Vector3D is mutable
-            position = point_to_check.clone()
-            points = [position.clone()]
-
-            # go as far as possible in positive direction, either until no match found or victory found
-            for i in range(2):
-                position += direction
-                temp = self.checkForWrap(position)
-                # edge found
-                if temp is None:
-                    position -= direction
-                    break
-                position = temp
-                points.append(position.clone())
-                if self.grid[position.x][position.y][position.z] != player:
-                    position -= direction
-                    position = self.checkForWrap(position)
-                    break
-            else:
-                return True, points, direction
-
-            # start again in opposite direction from furthest point found
-            # could be more efficient by re-using earlier progress, but it's not very expensive anyway
-            points = [position.clone()]
-
-            for i in range(2):
-                position -= direction
-                temp = self.checkForWrap(position)
-                if temp is None:
-                    break
-                position = temp
-                points.append(position.clone())
-                if self.grid[position.x][position.y][position.z] != player:
-                    break
-            else:
-                return True, points, direction
-
-        return False, None, None
-
     def makeMove(self, position, player):
         """Attempts to put player's marker at position. If a valid move, will increment self.currentTurn and check for victory."""
-        if self.grid[position.x][position.y][position.z] != -1 or not self.draw_selected:
+        if not self.draw_selected:
             return
-        self.changePoint(position, player)
-        game_won, self.winningLine, self.winningDirection = self.checkForWin(position, player)
-        if game_won:
-            self.winner = self.currentTurn
-            self.draw_selected = False
-        self.currentTurn += 1
-        if self.currentTurn >= len(self.players):
-            self.currentTurn = 0
+        if super().makeMove(position, player):
+            if self.winner > -1:
+                self.draw_selected = False
+            self.objects = []
+
+    def humanTurn(self):
+        """Returns whether the current player isn't controlled by the computer."""
+        return not isinstance(self.players[self.currentTurn], ComputerPlayer)
+
+    def undo(self):
+        """Takes back moves until it's a person's turn again, as computer players would just replay them."""
+        if not super().undo():
+            return False
+        if any(not isinstance(player, ComputerPlayer) for player in self.players):
+            while not self.humanTurn() and super().undo():
+                pass
+        self.draw_selected = self.winner == -1
         self.objects = []
+        return True
+
+    def redo(self):
+        """Makes undone moves again until it's a person's turn."""
+        if not super().redo():
+            return False
+        while not self.humanTurn() and super().redo():
+            pass
+        self.draw_selected = self.winner == -1
+        self.objects = []
+        return True
 
-    def changePoint(self, position, new):
-        """Converts Vector3D values to grid indices, saves on boilerplate code."""
-        x = position.x
-        y = position.y
-        z = position.z
-        self.grid[x][y][z] = new
+    def computerMove(self):
+        """Lets the current player choose their move if they're controlled by the computer."""
+        player = self.players[self.currentTurn]
+        if not self.running or self.winner != -1 or self.isDraw() or not isinstance(player, ComputerPlayer):
+            return
+        cell = player.chooseMove(self)
+        if cell is None:
+            return
+        self.playCell(cell, self.currentTurn)
+        self.computerReport = player.report()
+        if self.winner > -1:
+            self.draw_selected = False
+        self.objects = []
 
     def eventLoop(self, events):
+        # computer moves are made here rather than straight after the previous move, so that move is drawn first
+        self.computerMove()
         # This grew as I added more functionality, and at this point really ought to be a lookup with keys -> actions
         for event in events:
             if event.type == pygame.QUIT:
@@ -256,14 +189,23 @@ class Match:
                     self.moveSelection("Down")
                 elif event.key == keybinds["Place"]:
                     if self.winner == -1:
-                        self.makeMove(self.currentlySelected, self.currentTurn)
+                        if self.humanTurn():
+                            self.makeMove(self.currentlySelected, self.currentTurn)
                     else:
                         self.running = False
                 elif event.key == keybinds["Swap_View"]:
                     self.render3d = not self.render3d
+                    # the 3d view draws over the whole screen
+                    self.sideBySide.invalidate()
                 elif event.key == keybinds["Toggle_Cursor"]:
                     self.draw_selected = not self.draw_selected
                     self.objects = []
+                elif event.key == keybinds["Save"]:
+                    savegame.save(self, savePath)
+                elif event.key == keybinds["Undo"]:
+                    self.undo()
+                elif event.key == keybinds["Redo"]:
+                    self.redo()
                 elif self.render3d:
                     if event.key == keybinds["Reset_Camera"]:
                         self.camera.target = Position3d(0, 0, 0)
@@ -284,6 +226,9 @@ class Match:
                     elif event.key == keybinds["Toggle_Transparent_Cubes"]:
                         self.solid_cubes = not self.solid_cubes
                         self.objects = []
+                    elif event.key == keybinds["Cycle_Sorting"]:
+                        modes = list(sortModes)
+                        self.camera.sorting = modes[(modes.index(self.camera.sorting) + 1) % len(modes)]
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 4:
                     if self.render3d:
@@ -352,8 +297,7 @@ class Match:
         """Converts direction from camera's orientation to global directions."""
         angle = math.pi / 2
         vector = directions[direction] + Vector3d(0, 0, 0)
-        rotation = self.camera.orientation
-        rotation /= angle
+        rotation = self.camera.orientation / angle
         vector.rotateX(round(rotation.x) * angle)
         vector.rotateY(round(rotation.y) * angle)
         vector.rotateZ(round(rotation.z) * angle)
@@ -402,28 +346,6 @@ class Match:
         if self.wrapping or old != self.currentlySelected:
             self.objects = []
 
-    def getLayer(self, y):
-        """Returns a slice of the 3d grid at level y, or None if y is out of bounds."""
-        if y < 0 or y >= self.y:
-            return None
-
-        temp = self.generate2dGrid(self.x, self.z)
-        for x in range(self.x):
-            for z in range(self.z):
-                temp[x][z] = self.grid[x][y][z]
-
-        return temp
-
-    def printGrid(self):
-        """Prints the grid in 2d slices from lowest y to highest. Used for debugging."""
-        for y in range(self.y):
-            for z in range(self.z):
-                for x in range(self.x):
-                    print(self.grid[x][y][z], end="")
-                print()
-            print()
-            print()
-
     def render(self, width, height):
         """Renders the current game-state to a canvas of dimensions width x height."""
         if self.render3d:
@@ -433,13 +355,17 @@ class Match:
 
     def draw_bg(self, canvas):
         """Fills canvas with tint of current player's colour."""
+        canvas.fill(self.backgroundColour())
+
+    def backgroundColour(self):
+        """Returns white tinted with the current player's colour."""
         bg = [255, 255, 255]
         if self.running and self.winner == -1:
             for i in range(3):
                 bg[i] *= 0.95
                 bg[i] += self.players[self.currentTurn].colour[i] * 0.05
                 bg[i] = round(bg[i])
-        canvas.fill(tuple(bg))
+        return tuple(bg)
 
     def invertColour(self, colour):
         """Inverts given colour, currently unused."""
@@ -449,262 +375,172 @@ class Match:
         return newColour
 
     def renderSideBySide(self, width, height):
-        """Renders the game state as adjacent 2d slices to a canvas of dimensions width x height"""
-        # determines which grids to render, keeping the currently selected grid in the middle unless that would result
-        # in empty space.
-        min_range = self.currentlySelected.y - math.floor(self.zoom2d / 2)
-        max_range = self.currentlySelected.y + math.ceil(self.zoom2d / 2)
-        if not self.wrapping:
-            if min_range < 0:
-                max_range -= min_range
-                min_range = 0
-            elif max_range > self.y:
-                diff = self.y - max_range
-                min_range += diff
-                max_range += diff
-
-        # grabs vertical slices
-        grids = []
-        for i in range(min_range, max_range):
-            if i < 0 and self.wrapping:
-                i += self.y
-            elif i >= self.y and self.wrapping:
-                i -= self.y
-            grids.append(self.getLayer(i))
-
-        canvas = pygame.Surface((width, height), pygame.SRCALPHA)
-        self.draw_bg(canvas)
-
-        # calculates what the largest the grid can be to fit {self.zoom2d} in view side by side.
-        gridSize = min(width // self.zoom2d, height)
-        # calculates gap at edges with the calculated size
-        if gridSize == width // self.zoom2d:
-            offset = (0, (height - gridSize) // 2)
-        else:
-            offset = ((width - gridSize * self.zoom2d) // 2, 0)
-
-        # calculates what width the gridlines should be
-        line_width = max(2, gridSize // 80)
-
-        # calculates what size the markers should be
-        markerSize = min(gridSize // self.x, gridSize // self.z) - 2 * line_width
-        if self.x > self.z:
-            gridOffset = (0, markerSize * (self.x - self.z))
-        elif self.x < self.z:
-            gridOffset = (markerSize * (self.z - self.x), 0)
-        else:
-            gridOffset = (0, 0)
-
-        for i in range(len(grids)):
-            grid = grids[i]
-            if grid == None:
-                continue
-
-            # calculates left and bottom boundaries of the ith grid
-            gridLeft = gridOffset[0] + (gridSize + gridOffset[0]) * i + offset[0] + (2 * line_width)
-            gridBottom = gridSize - gridOffset[1] - markerSize - (2 * line_width) + offset[1]
-
-            for x in range(len(grid)):
-                for y in range(len(grid[0])):
-                    player = grid[x][y]
-
-                    # boundary of 2d position
-                    left = gridLeft + x * (markerSize + line_width)
-                    top = gridBottom - y * (markerSize + line_width)
-                    # if someone has played at (x, y), draw a square
-                    if player != -1:
-                        colour = self.players[player].colour
-                        # if (x, y) is the currently selected space, draw a border to indicate
-                        if self.draw_selected and (x, y) == (self.currentlySelected.x, self.currentlySelected.z) and i + min_range == self.currentlySelected.y:
-                            pygame.draw.rect(canvas, self.players[self.currentTurn].colour, pygame.Rect(left, top, markerSize, markerSize))
-                            pygame.draw.rect(canvas, colour,
-                                             pygame.Rect(left + line_width * 4, top + line_width * 4, markerSize - line_width * 8,
-                                                         markerSize - line_width * 8))
-                        else:
-                            pygame.draw.rect(canvas, colour, pygame.Rect(left, top, markerSize, markerSize))
-                            # draw black square inside if part of winning line
-                            if self.winner > -1 and Vector3d(x, i + min_range, y) in self.winningLine:
-                                pygame.draw.rect(canvas, (0, 0, 0), pygame.Rect(left + markerSize // 4, top + markerSize // 4, markerSize // 2, markerSize // 2))
-                    # if square hasn't been played at but is selected, draw border
-                    elif self.draw_selected and (x, y) == (self.currentlySelected.x, self.currentlySelected.z) and i + min_range == self.currentlySelected.y:
-                        pygame.draw.rect(canvas, self.players[self.currentTurn].colour,
-                                         pygame.Rect(left, top, markerSize, markerSize))
-                        pygame.draw.rect(canvas, (255, 255, 255),
-                                         pygame.Rect(left + line_width * 4, top + line_width * 4,
-                                                     markerSize - line_width * 8,
-                                                     markerSize - line_width * 8))
-
-            # draw gridlines
-            top = gridBottom - (self.z - 1) * (markerSize + line_width)
-            for x in range(1, len(grid)):
-                left = gridLeft + x * (markerSize + line_width) - line_width
-                pygame.draw.rect(canvas, (0, 0, 0), pygame.Rect(left, top, line_width, (markerSize + line_width) * self.z - line_width))
-
-            for y in range(0, len(grid[0]) - 1):
-                top = gridBottom - y * (markerSize + line_width) - line_width
-                pygame.draw.rect(canvas, (0, 0, 0), pygame.Rect(gridLeft, top, (markerSize + line_width) * self.x - line_width, line_width))
-
-        return canvas
+        """Renders the game state as adjacent 2d slices to a canvas of dimensions width x height. The canvas is kept
+        between frames, and only the parts which have changed are redrawn."""
+        if self.canvas2d is None or self.canvas2d.get_size() != (width, height):
+            self.canvas2d = pygame.Surface((width, height))
+        self.sideBySide.draw(self.canvas2d)
+        return self.canvas2d
 
     def renderIn3d(self, width, height):
         """Renders the game state as a 3d grid to a canvas of dimensions width x height"""
-        def get_edge(x, y, z):
-            return Position3d(x - 0.5, y - 0.5, z - 0.5) - centre
-
         # will attempt to lower details if performance drops too low, mainly lowering the number of objects to draw
-        # for the gridlines. Chosen thresholds shouldn't cause too much flickering.
-        if self.lod < 3:
-            if self.lod == 2 and self.camera.clock.get_fps() < 15:
-                self.lod += 1
-                self.objects = []
-            elif self.lod < 2 and 0 < self.camera.clock.get_fps() < 30:
-                self.lod += 1
-                self.objects = []
-        if self.lod > 0:
-            if self.lod == 3 and self.camera.clock.get_fps() > 140:
-                self.lod -= 1
-                self.objects = []
-            elif self.lod < 3 and self.camera.clock.get_fps() > 70:
-                self.lod -= 1
-                self.objects = []
-
-        canvas = pygame.Surface((width, height))
+        # for the gridlines. Grids for each level are cached, so changing level doesn't rebuild anything that's been
+        # seen recently.
+        start = time.perf_counter()
+        self.lod = self.detail.update(self.lod, self.camera.clock.get_time() / 1000)
+
+        # the canvas is drawn over completely every frame, so the same one is reused rather than allocating a new one
+        canvas = surfacePool.get((width, height))
         self.draw_bg(canvas)
 
-        # determines origin point
+        # determines origin point. Objects are built in grid coordinates and the camera is offset by centre instead,
+        # so they don't need rebuilding when it moves
         if self.focus_centre or self.wrapping:
             x, y, z = (self.x - 1) / 2, (self.y - 1) / 2, (self.z - 1) / 2
         else:
             x, y, z = self.currentlySelected.x, self.currentlySelected.y, self.currentlySelected.z
         centre = Position3d(x, y * self.explosion, z)
 
-        # cache objects, since only need to regenerate if gamestate, LoD or viewing options change.
+        # the grid only depends on the board's size, explosion and LoD, so is shared through gridCache
+        grid = gridCache.get((self.x, self.y, self.z, round(self.explosion, 6), self.lod), self.buildGrid)
+
+        # cache markers, since only need to regenerate if gamestate or viewing options change.
         if not self.objects:
             rotation = Rotation3d(0, 0, 0)
-            for x in range(self.x):
-                for y in range(self.y):
-                    for z in range(self.z):
-                        index = self.grid[x][y][z]
-                        indexSelected = Position3d(x, y, z) == self.currentlySelected and self.draw_selected
-                        if index == -1 and not indexSelected:
-                            continue
-
-                        # calculates position to draw index at
-                        if self.wrapping:
-                            y1 = (y - self.currentlySelected.y + self.y // 2) % self.y
-                            if self.focus_centre:
-                                x1 = x
-                                z1 = z
-                            else:
-                                x1 = (x - self.currentlySelected.x + self.x // 2) % self.x
-                                z1 = (z - self.currentlySelected.z + self.z // 2) % self.z
-                            position = Position3d(x1, y1 * self.explosion, z1) - centre
-                        else:
-                            position = Position3d(x, y * self.explosion, z) - centre
-
-                        size = Vector3d(0.5, 0.5, 0.5)
-                        if self.solid_cubes:
-                            outline_width = 0.02
-                        else:
-                            outline_width = 0
-                        outline_colour = (0, 0, 0)
-                        colour = self.players[index].colour
-
-                        if self.winner > -1 and Vector3d(x, y, z) in self.winningLine:
-                            # if part of winning line, draw as opaque cube of winner's colour with thick black outline
-                            outline_width = 0.15
-                            size = Vector3d(0.4, 0.4, 0.4)
-                            colour = (0, 0, 0)
-                            outline_colour = self.players[self.winner].colour
-                        elif indexSelected:
-                            # if selected and empty, draw as colour cube with black outline
-                            if index == -1:
-                                colour = self.players[self.currentTurn].colour
-                            else:
-                                # if occupied, draw outline and colour depending on opaque rendering scheme
-                                outline_colour = self.players[self.currentTurn].colour
-                                if outline_width == 0:
-                                    outline_colour, colour = colour, outline_colour
-                            outline_width = 0.1
-                        if outline_width > 0:
-                            self.objects.append(Cuboid(position, size, rotation, colour, outline_width, outline_colour))
-                        else:
-                            self.objects.append(WireframeCuboid(position, size, rotation, colour, 45))
-
-            colour = (0, 0, 0)
-            thickness = 0.05
-            yrange = [y * self.explosion for y in range(0, self.y)]
-
-            # this could probably be refactored to look neater, but might not be worth the computational effort.
-            # LoD Levels:
-            #   0: Full cuboids, each segment rendered individually
-            #   1: Two 2d faces making a + shape, each segment rendered individually.
-            #       Looks very similar except when viewed length-wise, and reduced number of faces by factor of 2.
-            #       Doesn't increase performance by much as also doubles object count, usually skipped to LoD 2
-            #   2: One single face, each segment rendered individually
-            #   3: One single face for an entire line
-            #       Can cause weird artifacts near edges, especially with larger grids. Massive performance boost.
-
-            # Possibly room for another level between 2 and 3, with one cuboid for entire line?
-            # N.B. only vertical lines are drawn when using an exploded view.
-            for x in range(1, self.x):
-                for y in yrange[1:]:
-                    if self.explosion == 1:
-                        if self.lod < 3:
-                            for z2 in range(0, self.z):
-                                if self.lod == 0:
-                                    position = get_edge(x, y, z2 + 0.5)
-                                    size = Vector3d(thickness, thickness, 1)
-                                    self.objects.append(Cuboid(position, size, rotation, colour))
-                                else:
-                                    p1 = get_edge(x, y, z2)
-                                    p2 = get_edge(x, y, z2 + 1)
-                                    self.objects.append(Line(p1, p2, thickness, Position3d(0, 1, 0), (0, 0, 0)))
-                                    if self.lod == 1:
-                                        self.objects.append(Line(p1, p2, thickness, Position3d(1, 0, 0), (0, 0, 0)))
-                        else:
-                            p1 = get_edge(x, y, 0)
-                            p2 = get_edge(x, y, self.z)
-                            self.objects.append(Line(p1, p2, thickness, Position3d(0, 1, 0), (0, 0, 0)))
-                        for z in range(1, self.z):
-                            if self.lod < 3:
-                                for x2 in range(0, self.x):
-                                    if self.lod == 0:
-                                        position = get_edge(x2 + 0.5, y, z)
-                                        size = Vector3d(1, thickness, thickness)
-                                        self.objects.append(Cuboid(position, size, rotation, colour))
-                                    else:
-                                        p1 = get_edge(x2, y, z)
-                                        p2 = get_edge(x2 + 1, y, z)
-                                        self.objects.append(Line(p1, p2, thickness, Position3d(0, 1, 0), (0, 0, 0)))
-                                        if self.lod == 1:
-                                            self.objects.append(Line(p1, p2, thickness, Position3d(0, 0, 1), (0, 0, 0)))
-                            else:
-                                p1 = get_edge(0, y, z)
-                                p2 = get_edge(self.x, y, z)
-                                self.objects.append(Line(p1, p2, thickness, Position3d(0, 1, 0), (0, 0, 0)))
-                for z in range(1, self.z):
-                    if self.lod < 3 or self.explosion != 0:
-                        for y2 in yrange:
-                            if self.lod == 0:
-                                position = get_edge(x, y2 + 0.5, z)
-                                size = Vector3d(thickness, 1, thickness)
-                                self.objects.append(Cuboid(position, size, rotation, colour))#
-                            else:
-                                p1 = get_edge(x, y2, z)
-                                p2 = get_edge(x, y2 + 1, z)
-                                self.objects.append(Line(p1, p2, thickness, Position3d(1, 0, 0), (0, 0, 0)))
-                                if self.lod == 1:
-                                    self.objects.append(Line(p1, p2, thickness, Position3d(0, 0, 1), (0, 0, 0)))
+            # only occupied cells and the selection need drawing, so avoid walking the entire grid
+            cells = list(self.grid.occupiedCells())
+            selected = self.currentlySelected
+            selectedInBounds = 0 <= selected.x < self.x and 0 <= selected.y < self.y and 0 <= selected.z < self.z
+            if self.draw_selected and selectedInBounds and self.grid[selected.x, selected.y, selected.z] == -1:
+                cells.append((selected.x, selected.y, selected.z, -1))
+            for x, y, z, index in cells:
+                indexSelected = self.draw_selected and (x, y, z) == (selected.x, selected.y, selected.z)
+
+                # calculates position to draw index at
+                if self.wrapping:
+                    y1 = (y - self.currentlySelected.y + self.y // 2) % self.y
+                    if self.focus_centre:
+                        x1 = x
+                        z1 = z
+                    else:
+                        x1 = (x - self.currentlySelected.x + self.x // 2) % self.x
+                        z1 = (z - self.currentlySelected.z + self.z // 2) % self.z
+                    position = Position3d(x1, y1 * self.explosion, z1)
+                else:
+                    position = Position3d(x, y * self.explosion, z)
+
+                size = Vector3d(0.5, 0.5, 0.5)
+                if self.solid_cubes:
+                    outline_width = 0.02
+                else:
+                    outline_width = 0
+                outline_colour = (0, 0, 0)
+                colour = self.players[index].colour
+
+                if self.winner > -1 and Vector3d(x, y, z) in self.winningLine:
+                    # if part of winning line, draw as opaque cube of winner's colour with thick black outline
+                    outline_width = 0.15
+                    size = Vector3d(0.4, 0.4, 0.4)
+                    colour = (0, 0, 0)
+                    outline_colour = self.players[self.winner].colour
+                elif indexSelected:
+                    # if selected and empty, draw as colour cube with black outline
+                    if index == -1:
+                        colour = self.players[self.currentTurn].colour
                     else:
-                        p1 = get_edge(x, 0, z)
-                        p2 = get_edge(x, self.y, z)
-                        self.objects.append(Line(p1, p2, thickness, Position3d(1, 0, 0), (0, 0, 0)))
+                        # if occupied, draw outline and colour depending on opaque rendering scheme
+                        outline_colour = self.players[self.currentTurn].colour
+                        if outline_width == 0:
+                            outline_colour, colour = colour, outline_colour
+                    outline_width = 0.1
+                if outline_width > 0:
+                    self.objects.append(Cuboid(position, size, rotation, colour, outline_width, outline_colour))
+                else:
+                    self.objects.append(WireframeCuboid(position, size, rotation, colour, 45))
 
         # Draw the scene
-        self.camera.render(canvas, self.objects, width, height)
+        profiler.add("scene", time.perf_counter() - start)
+        self.camera.render(canvas, self.objects, width, height, grid, centre)
+        for phase, seconds in self.camera.frameTimes.items():
+            profiler.add(phase, seconds)
         return canvas
 
+    def buildGrid(self):
+        """Returns the objects making up the gridlines, in grid coordinates."""
+        def get_edge(x, y, z):
+            return Position3d(x - 0.5, y - 0.5, z - 0.5)
+
+        objects = []
+        yrange = [y * self.explosion for y in range(0, self.y)]
+
+        # LoD Levels:
+        #   0: Full cuboids, each segment rendered individually
+        #   1: Two 2d faces making a + shape, each segment rendered individually.
+        #       Looks very similar except when viewed length-wise, and reduced number of faces by factor of 2.
+        #       Doesn't increase performance by much as also doubles object count, usually skipped to LoD 2
+        #   2: One single face, each segment rendered individually
+        #   3: One cuboid for an entire line
+        #       Looks like LoD 0, but long lines can be drawn over markers they're behind.
+        #   4: One single face for an entire line
+        #       Can cause weird artifacts near edges, especially with larger grids. Massive performance boost.
+        # Segments further than detailDistance() from the camera are drawn as at LoD 2 and lines as at LoD 4.
+        # N.B. only vertical lines are drawn when using an exploded view, and they can't be merged as the layers
+        # are apart.
+        whole = self.lod >= 3
+        distance = self.detailDistance()
+        if self.explosion == 1:
+            for y in yrange[1:]:
+                for x in range(1, self.x):
+                    if whole:
+                        objects.append(self.gridline(get_edge(x, y, 0), get_edge(x, y, self.z), distance))
+                    else:
+                        for z2 in range(0, self.z):
+                            objects.append(self.gridline(get_edge(x, y, z2), get_edge(x, y, z2 + 1), distance))
+                for z in range(1, self.z):
+                    if whole:
+                        objects.append(self.gridline(get_edge(0, y, z), get_edge(self.x, y, z), distance))
+                    else:
+                        for x2 in range(0, self.x):
+                            objects.append(self.gridline(get_edge(x2, y, z), get_edge(x2 + 1, y, z), distance))
+        for x in range(1, self.x):
+            for z in range(1, self.z):
+                if whole and self.explosion == 1:
+                    objects.append(self.gridline(get_edge(x, 0, z), get_edge(x, self.y, z), distance))
+                else:
+                    for y2 in yrange:
+                        objects.append(self.gridline(get_edge(x, y2, z), get_edge(x, y2 + 1, z), distance))
+        return objects
+
+    def gridline(self, p1, p2, distance):
+        """Returns the object for a gridline from p1 to p2 at the current LoD, drawn with less detail beyond distance,
+        see buildGrid."""
+        levels = [(0, self.gridlineObjects(p1, p2, self.lod))]
+        # single faces are as simple as each kind of line gets
+        simpler = {0: 2, 1: 2, 3: 4}.get(self.lod)
+        if simpler is not None:
+            levels.append((distance, self.gridlineObjects(p1, p2, simpler)))
+        return DistanceDetail(levels)
+
+    def gridlineObjects(self, p1, p2, lod):
+        """Returns the objects which draw a gridline from p1 to p2 at a LoD."""
+        thickness = 0.05
+        direction = p2 - p1
+        # the directions across the line, with single faces drawn along the first
+        if direction.y:
+            across = (Position3d(1, 0, 0), Position3d(0, 0, 1))
+        elif direction.x:
+            across = (Position3d(0, 1, 0), Position3d(0, 0, 1))
+        else:
+            across = (Position3d(0, 1, 0), Position3d(1, 0, 0))
+        if lod in (0, 3):
+            size = Vector3d(abs(direction.x) or thickness, abs(direction.y) or thickness, abs(direction.z) or thickness)
+            return [Cuboid((p1 + p2) / 2, size, Rotation3d(0, 0, 0), (0, 0, 0))]
+        objects = [Line(p1, p2, thickness, across[0], (0, 0, 0))]
+        if lod == 1:
+            objects.append(Line(p1, p2, thickness, across[1], (0, 0, 0)))
+        return objects
+
     def start(self):
         self.currentlySelected = Position3d(0, 0, 0)
         self.running = True
@@ -712,6 +548,57 @@ class Match:
         self.objects = []
 
 
+# least distance from the camera beyond which gridlines are drawn with less detail, as they're under a pixel wide.
+# Larger boards move it further away, see Match.detailDistance
+minDetailDistance = 16
+
+# gridlines for recently used board settings, shared between matches so the menu preview doesn't rebuild them
+gridCache = LayerCache(8)
+
+# canvases for the 3d view, shared between matches and kept across window resizes
+surfacePool = SurfacePool(4)
+
+# times every frame, for the overlay toggled by Toggle_Profiler
+profiler = FrameProfiler()
+
+# shared by every alpha-beta player, so analysis carries over between seats and games
+positionCache = PositionCache()
+
+
+def createPlayers(numPlayers, computers, cells=27, wrapping=False):
+    """Creates numPlayers players, with the computer controlling every seat whose bit is set in computers.
+    Alpha-beta is used for small 2 player games, and MCTS for everything else."""
+    players = []
+    for i in range(numPlayers):
+        if not computers >> i & 1:
+            players.append(Player())
+        elif numPlayers == 2 and cells <= maxCells and not wrapping:
+            players.append(AlphaBetaPlayer(cache=positionCache))
+        else:
+            players.append(MCTSPlayer())
+    return players
+
+
+def computersText(computers):
+    seats = [str(i + 1) for i in range(computers.bit_length()) if computers >> i & 1]
+    return "Computers: " + (", ".join(seats) if seats else "None")
+
+
+def profileCounts(match):
+    """Returns what the last frame of match drew, for FrameProfiler.endFrame."""
+    if not match.render3d:
+        return {}
+    return match.camera.lastFrame
+
+
+def toggleRecording():
+    """Starts recording frames, or writes the frames recorded so far to profilePath."""
+    if profiler.recording is None:
+        profiler.record()
+    else:
+        profiler.dump(profilePath)
+
+
 def applyResize(width, height):
     """Horrible function which resizes UI elements when window resized"""
     global windowX
@@ -733,121 +620,202 @@ def applyResize(width, height):
     screen = pygame.display.set_mode((windowX, windowY), pygame.RESIZABLE, 32)
 
 
-borderX = 100
-borderY = 20
-fps_font = pygame.font.SysFont("Arial", 36, bold=True)
-
-# default values
-show_fps = False
-x = 3
-y = 3
-z = 3
-explosion = 1
-numPlayers = 2
-wrapping = False
-players = [Player(), Player()]
-
-while True:
-    marginX = windowX // 3
-    marginY = windowY // 6
-
-    bWidth = marginX // 6
-    bHeight = marginY // 3
-    bHMargin = marginY // 6
-    bWMargin = marginX // 12
-
-    # button constants
-    absYs = [bHMargin * (i + 1) + bHeight * 3 * (i) for i in range(5)]
-    vals = [x, y, z, numPlayers, explosion]
-    mins = [1, 1, 1, 2, 1]
-    steps = [1, 1, 1, 1, 0.2]
-
-    # generate buttons
-    buttons = [IntegerButtons(colours["text"], colours["button"], colours["triButton"], bWidth, bHeight, bWMargin,
-                              absYs[i], minValue=mins[i], value=vals[i], step=steps[i]) for i in range(5)]
-    wrapping_button = Button("Wrapping: "+str(wrapping), colours["text"], colours["triButton"], bWidth*4, bHeight*2, marginX, windowY -bHeight*2-bHMargin)
-    buttons.append(wrapping_button)
-
-    # generate button labels
-    text = ["Width", "Height", "Depth", "Players", "Explosion"]
-    labels = [Text(text[i], colours["text"], absX=bWMargin * 2 + bWidth, absY=absYs[i]+bHeight) for i in range(5)]
-    for label in labels:
-        label.scale(2 * marginX // 3, bHeight)
-
-    game = Match(x, y, z, explosion, players, wrapping, True)
-
-    # event loop while in settings menu
-    while not game.running:
-        screen.fill((255, 255, 255))
+# kept under __main__ so worker processes for computer players can import this file without opening a window
+if __name__ == "__main__":
+    pygame.init()
+    pygame.key.set_repeat(350, 50)
+    screen = pygame.display.set_mode((windowX, windowY), pygame.RESIZABLE, 32)
 
-        # draw buttons
-        mousePos = pygame.mouse.get_pos()
-        for button in buttons:
-            button.checkHighlight(mousePos[0], mousePos[1])
-            screen.blit(button.image, (button.absX, button.absY))
+    borderX = 100
+    borderY = 20
+    fps_font = pygame.font.SysFont("Arial", 36, bold=True)
+    # the counter only changes a few times a second, so its text is only rendered when it does
+    fps_text = TextCache(fps_font)
+    profile_font = pygame.font.SysFont("Courier New", 16, bold=True)
+    profile_text = TextCache(profile_font, 128)
+
+    # default values
+    show_fps = False
+    show_profiler = False
+    x = 3
+    y = 3
+    z = 3
+    explosion = 1
+    numPlayers = 2
+    win_length = 3
+    wrapping = False
+    # bitmask of the seats controlled by the computer
+    computers = 0
+    players = createPlayers(numPlayers, computers)
+
+    while True:
+        marginX = windowX // 3
+        marginY = windowY // 6
+
+        bWidth = marginX // 6
+        bHeight = marginY // 4
+        bHMargin = marginY // 6
+        bWMargin = marginX // 12
+
+        # button constants
+        absYs = [bHMargin * (i + 1) + bHeight * 3 * (i) for i in range(6)]
+        vals = [x, y, z, numPlayers, explosion, win_length]
+        mins = [1, 1, 1, 2, 1, 2]
+        steps = [1, 1, 1, 1, 0.2, 1]
+
+        # generate buttons
+        buttons = [IntegerButtons(colours["text"], colours["button"], colours["triButton"], bWidth, bHeight, bWMargin,
+                                  absYs[i], minValue=mins[i], value=vals[i], step=steps[i]) for i in range(6)]
+        wrapping_button = Button("Wrapping: "+str(wrapping), colours["text"], colours["triButton"], bWidth*4, marginY*2//3, marginX, windowY -marginY*2//3-bHMargin)
+        buttons.append(wrapping_button)
+        computers_button = Button(computersText(computers), colours["text"], colours["triButton"], bWidth*4, marginY*2//3, marginX + bWidth*4 + bWMargin, windowY -marginY*2//3-bHMargin)
+        buttons.append(computers_button)
+
+        # generate button labels
+        text = ["Width", "Height", "Depth", "Players", "Explosion", "Line"]
+        labels = [Text(text[i], colours["text"], absX=bWMargin * 2 + bWidth, absY=absYs[i]+bHeight) for i in range(6)]
         for label in labels:
-            screen.blit(label.image, (label.absX, label.absY))
-
-        # draw game preview
-        screen.blit(game.render(windowX - marginX, windowY - marginY), (marginX, 0))
-        pygame.draw.rect(screen, (0, 0, 0), pygame.Rect(marginX, 0, windowX - marginX, windowY - marginY), 3)
-
-        game.camera.clock.tick()
-        if show_fps:
-            fps = str(int(game.camera.clock.get_fps()))+" / "+str(game.lod)
-            fps_t = fps_font.render(fps, True, pygame.Color("RED"))
-            screen.blit(fps_t, (0, 0))
-
-        pygame.display.flip()
-        events = pygame.event.get()
-        for event in events:
-            if event.type == pygame.VIDEORESIZE:
-                applyResize(event.w, event.h)
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                for i in range(len(buttons)):
-                    if buttons[i].checkClick(event.button):
-                        if i == 0:
-                            x = buttons[i].value
-                        elif i == 1:
-                            y = buttons[i].value
-                        elif i == 2:
-                            z = buttons[i].value
-                        elif i == 3:
-                            numPlayers = buttons[i].value
-                            players = [Player() for i in range(numPlayers)]
-                        elif i == 4:
-                            explosion = buttons[i].value
-                        elif i == 5:
-                            wrapping = not wrapping
-                            wrapping_button.text.changeText("Wrapping: "+str(wrapping))
-                            wrapping_button.draw()
-                        game = Match(x, y, z, explosion, players, wrapping, True)
-                        break
-            elif event.type == pygame.KEYDOWN:
-                if event.key == keybinds["Place"]:
-                    game.start()
-                elif event.key == keybinds["Toggle_FPS"]:
+            label.scale(2 * marginX // 3, bHeight)
+
+        game = Match(x, y, z, explosion, players, wrapping, True, win_length)
+
+        # event loop while in settings menu
+        while not game.running:
+            screen.fill((255, 255, 255))
+
+            # draw buttons
+            mousePos = pygame.mouse.get_pos()
+            for button in buttons:
+                button.checkHighlight(mousePos[0], mousePos[1])
+                screen.blit(button.image, (button.absX, button.absY))
+            for label in labels:
+                screen.blit(label.image, (label.absX, label.absY))
+
+            # draw game preview
+            screen.blit(game.render(windowX - marginX, windowY - marginY), (marginX, 0))
+            pygame.draw.rect(screen, (0, 0, 0), pygame.Rect(marginX, 0, windowX - marginX, windowY - marginY), 3)
+
+            game.camera.clock.tick()
+            if show_fps:
+                fps = str(int(game.camera.clock.get_fps()))+" / "+str(game.lod)
+                fps_t = fps_text.render(fps, True, pygame.Color("RED"))
+                screen.blit(fps_t, (0, 0))
+            if show_profiler:
+                profiler.draw(screen, profile_text, (0, fps_font.get_linesize()))
+
+            with profiler.phase("flip"):
+                pygame.display.flip()
+            profiler.endFrame(**profileCounts(game))
+            events = pygame.event.get()
+            for event in events:
+                if event.type == pygame.VIDEORESIZE:
+                    applyResize(event.w, event.h)
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    for i in range(len(buttons)):
+                        if buttons[i].checkClick(event.button):
+                            if i == 0:
+                                x = buttons[i].value
+                            elif i == 1:
+                                y = buttons[i].value
+                            elif i == 2:
+                                z = buttons[i].value
+                            elif i == 3:
+                                numPlayers = buttons[i].value
+                                computers &= (1 << numPlayers) - 1
+                                players = createPlayers(numPlayers, computers)
+                                computers_button.text.changeText(computersText(computers))
+                                computers_button.draw()
+                            elif i == 4:
+                                explosion = buttons[i].value
+                            elif i == 5:
+                                win_length = buttons[i].value
+                            elif i == 6:
+                                wrapping = not wrapping
+                                wrapping_button.text.changeText("Wrapping: "+str(wrapping))
+                                wrapping_button.draw()
+                            elif i == 7:
+                                # cycles through every combination of seats, backwards on right click
+                                step = -1 if event.button == 3 else 1
+                                computers = (computers + step) % (1 << numPlayers)
+                                players = createPlayers(numPlayers, computers)
+                                computers_button.text.changeText(computersText(computers))
+                                computers_button.draw()
+                            game = Match(x, y, z, explosion, players, wrapping, True, win_length)
+                            break
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == keybinds["Place"]:
+                        # computers are only created now, as the best choice depends on every setting
+                        players = createPlayers(numPlayers, computers, x * y * z, wrapping)
+                        game.players = players
+                        game.start()
+                    elif event.key == keybinds["Load"] and os.path.exists(savePath):
+                        record = savegame.load(savePath)
+                        x, y, z, explosion = record.x, record.y, record.z, record.explosion
+                        numPlayers, win_length, wrapping = len(record.players), record.win_length, record.wrapping
+                        computers = record.computers
+                        players = createPlayers(numPlayers, computers, x * y * z, wrapping)
+                        game = Match(x, y, z, explosion, players, wrapping, True, win_length)
+                        game.start()
+                        record.replay(game)
+                        if game.winner > -1:
+                            game.draw_selected = False
+                    elif event.key == keybinds["Toggle_FPS"]:
+                        show_fps = not show_fps
+                    elif event.key == keybinds["Toggle_Profiler"]:
+                        show_profiler = not show_profiler
+                    elif event.key == keybinds["Record_Profile"]:
+                        toggleRecording()
+                elif event.type == pygame.QUIT:
+                    exit()
+
+        while game.running:
+            if game.render3d:
+                screen.blit(game.render(windowX, windowY), (0, 0))
+                dirty = None
+            else:
+                # the 2d view is drawn straight to the screen, and only the parts which changed are updated
+                with profiler.phase("draw"):
+                    dirty = game.sideBySide.draw(screen)
+            game.camera.clock.tick()
+
+            if show_fps:
+                fps = str(int(game.camera.clock.get_fps()))+" / "+str(game.lod)
+                if game.computerReport:
+                    fps += " / "+game.computerReport
+                fps_t = fps_text.render(fps, True, pygame.Color("RED"))
+                fps_rect = screen.blit(fps_t, (0, 0))
+                if dirty is not None:
+                    dirty.append(fps_rect)
+                    game.sideBySide.invalidate(fps_rect)
+            if show_profiler:
+                profile_rect = profiler.draw(screen, profile_text, (0, fps_font.get_linesize()))
+                if dirty is not None and profile_rect is not None:
+                    dirty.append(profile_rect)
+                    game.sideBySide.invalidate(profile_rect)
+
+            with profiler.phase("flip"):
+                if dirty is None:
+                    pygame.display.flip()
+                elif dirty:
+                    pygame.display.update(dirty)
+            events = pygame.event.get()
+            for event in events:
+                if event.type == pygame.VIDEORESIZE:
+                    applyResize(event.w, event.h)
+                elif event.type == pygame.KEYDOWN and event.key == keybinds["Toggle_FPS"]:
                     show_fps = not show_fps
-            elif event.type == pygame.QUIT:
-                exit()
-
-    while game.running:
-        screen.blit(game.render(windowX, windowY), (0, 0))
-        game.camera.clock.tick()
-
-        if show_fps:
-            fps = str(int(game.camera.clock.get_fps()))+" / "+str(game.lod)
-            fps_t = fps_font.render(fps, True, pygame.Color("RED"))
-            screen.blit(fps_t, (0, 0))
-
-        pygame.display.flip()
-        events = pygame.event.get()
-        for event in events:
-            if event.type == pygame.VIDEORESIZE:
-                applyResize(event.w, event.h)
-            elif event.type == pygame.KEYDOWN and event.key == keybinds["Toggle_FPS"]:
-                show_fps = not show_fps
-            elif event.type == pygame.QUIT:
-                exit()
-
-        game.eventLoop(events)
+                elif event.type == pygame.KEYDOWN and event.key == keybinds["Toggle_Profiler"]:
+                    show_profiler = not show_profiler
+                    game.sideBySide.invalidate()
+                elif event.type == pygame.KEYDOWN and event.key == keybinds["Record_Profile"]:
+                    toggleRecording()
+                elif event.type == pygame.QUIT:
+                    exit()
+
+            with profiler.phase("eventLoop"):
+                game.eventLoop(events)
+            profiler.endFrame(**profileCounts(game))
+
+        for player in players:
+            if isinstance(player, ComputerPlayer):
+                player.close()
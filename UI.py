@@ -1,4 +1,6 @@
 import random
+from collections import OrderedDict
+from functools import lru_cache
 
 import pygame
 import pygame.gfxdraw
@@ -6,6 +8,37 @@ import pygame.gfxdraw
 colours = {"text": (255, 255, 255), "button": (100, 150, 200, 180), "textbox": (50, 50, 50, 180)}
 
 
+@lru_cache(maxsize=256)
+def getFont(name, size):
+    # loading a font is slow, and Text.scale tries several sizes every time the window is resized
+    return pygame.font.SysFont(name, size)
+
+
+class TextCache:
+    # keeps the size most recently rendered strings for a font, so text drawn every frame, like the FPS counter, is
+    # only rendered again when it changes. The surfaces are shared, so don't draw on them.
+
+    def __init__(self, font, size=32):
+        self.font = font
+        self.size = size
+        self.images = OrderedDict()
+        self.created = 0
+
+    def render(self, text, antialias, colour):
+        key = (text, antialias, tuple(colour))
+        image = self.images.get(key)
+        if image is not None:
+            self.images.move_to_end(key)
+            return image
+        self.created += 1
+        image = self.font.render(text, antialias, colour)
+        if self.size > 0:
+            self.images[key] = image
+            if len(self.images) > self.size:
+                self.images.popitem(last=False)
+        return image
+
+
 class Button:
     def __init__(self, text, textcolour, colour, width, height, absX, absY, font='Comic Sans MS'):
         self.text = Text(text, textcolour, font)
@@ -221,10 +254,10 @@ class Text:
         while w < width and h < height:
             j = i
             i += i
-            self.font = pygame.font.SysFont(self.fontName, i)
+            self.font = getFont(self.fontName, i)
             w, h = self.font.size(self.text)
         while i - j > 1:
-            self.font = pygame.font.SysFont(self.fontName, (i + j) // 2)
+            self.font = getFont(self.fontName, (i + j) // 2)
             w, h = self.font.size(self.text)
             if w > width or h > height:
                 i = (i + j) // 2
@@ -235,7 +268,7 @@ class Text:
         self.render()
 
     def Font(self):
-        self.font = pygame.font.SysFont(self.fontName, self.textSize)
+        self.font = getFont(self.fontName, self.textSize)
 
     def setFontName(self, fontName):
         self.fontName = fontName
@@ -0,0 +1,344 @@
+import random
+import time
+from collections import OrderedDict
+
+from engine import Player
+from bitboard import BitboardEngine, maxCells
+from lines import LineIndex
+
+# score for a won position, reduced by the number of moves it takes to get there so quicker wins are preferred
+WIN = 1000000
+# score for each line only one player has markers in, indexed by how many markers they have in it
+lineWeights = [0, 1, 8, 64, 512, 4096, 32768, 262144]
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def toStored(score, ply):
+    """Converts a score found ply moves from the root into one relative to the position itself, so a stored win
+    means the same number of moves wherever the position is reached again."""
+    if score > WIN // 2:
+        return score + ply
+    if score < -WIN // 2:
+        return score - ply
+    return score
+
+
+def fromStored(score, ply):
+    """Converts a stored score back into one relative to the root, for a position ply moves from it."""
+    if score > WIN // 2:
+        return score - ply
+    if score < -WIN // 2:
+        return score + ply
+    return score
+
+
+class ComputerPlayer(Player):
+    """A player whose moves are chosen by the computer. Can be put in any seat of a Match."""
+
+    def __init__(self, colour=(0, 0, 0), name="Computer"):
+        super().__init__(colour, name)
+        # statistics from the most recent search, for tuning
+        self.lastSearch = {}
+
+    def chooseMove(self, game):
+        """Returns the cell, as an index into game.grid.flat, that this player wants to play for game.currentTurn, or
+        None if there's nowhere left to play."""
+        raise NotImplementedError
+
+    def close(self):
+        """Releases any resources held between moves, such as worker processes."""
+        pass
+
+    def report(self):
+        """Returns a short summary of the last search."""
+        if not self.lastSearch:
+            return ""
+        return str(self.lastSearch.get("depth", "")) + "ply " + str(int(self.lastSearch["nps"])) + " nps"
+
+
+class ZobristKeys:
+    """Random 64 bit keys for every (player, cell) pair and for whose turn it is, so positions can be hashed
+    incrementally by xoring keys in and out."""
+
+    def __init__(self, cells, players, seed=0):
+        rng = random.Random(seed)
+        self.cells = [[rng.getrandbits(64) for cell in range(cells)] for player in range(players)]
+        self.turns = [rng.getrandbits(64) for player in range(players)]
+
+    def hash(self, state):
+        """Hashes state from scratch."""
+        key = self.turns[state.currentTurn]
+        for cell, player in enumerate(state.owners()):
+            if player != -1:
+                key ^= self.cells[player][cell]
+        return key
+
+
+class TranspositionTable:
+    """Stores search results keyed on Zobrist hash. Holds at most size entries, evicting the least recently used."""
+
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key, depth, score, flag, move):
+        entries = self.entries
+        if key in entries:
+            # keep deeper results for the same position
+            if entries[key][0] > depth:
+                return
+            entries.move_to_end(key)
+        elif len(entries) >= self.size:
+            entries.popitem(last=False)
+            self.evictions += 1
+        entries[key] = (depth, score, flag, move)
+
+    def clear(self):
+        self.entries.clear()
+
+
+# transposition table entry flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+def nearbyCells(state):
+    """Returns the empty cells next to an existing marker, or the centre cell if the board is empty."""
+    grid = state.grid
+    cells = set()
+    for x, y, z, player in grid.occupiedCells():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    nx, ny, nz = x + dx, y + dy, z + dz
+                    if state.wrapping:
+                        nx, ny, nz = nx % state.x, ny % state.y, nz % state.z
+                    elif not (0 <= nx < state.x and 0 <= ny < state.y and 0 <= nz < state.z):
+                        continue
+                    cell = grid.index(nx, ny, nz)
+                    if grid.flat[cell] == -1:
+                        cells.add(cell)
+    if not cells and state.moveCount == 0:
+        cells.add(grid.index(state.x // 2, state.y // 2, state.z // 2))
+    return list(cells) or state.legalCells()
+
+
+class AlphaBetaPlayer(ComputerPlayer):
+    """Chooses moves with an iteratively deepened alpha-beta search, giving up after time_limit seconds. Games with
+    more than 2 players are searched paranoidly, assuming every opponent is working together against this player.
+
+    Boards with up to 64 cells are searched on a BitboardEngine. Larger boards are searched on copies of the Engine,
+    only considering cells next to existing markers.
+
+    cache is an optional symmetry.PositionCache, which can be shared between players and kept between games. Positions
+    searched at least cache_depth deep are stored in it, so results are reused for every symmetric position."""
+
+    def __init__(self, colour=(0, 0, 0), name="Computer", time_limit=1.0, max_depth=None, table_size=1 << 16,
+                 cache=None, cache_depth=2):
+        super().__init__(colour, name)
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.table = TranspositionTable(table_size)
+        self.cache = cache
+        self.cache_depth = cache_depth
+        self.keys = None
+        self.nodes = 0
+        self.deadline = 0
+        self.seat = 0
+        self.killers = []
+
+    def chooseMove(self, game):
+        if game.x * game.y * game.z <= maxCells:
+            state = BitboardEngine.fromEngine(game)
+        else:
+            state = game.copy()
+        cells = game.x * game.y * game.z
+        if self.keys is None or len(self.keys.cells) != len(game.players) or len(self.keys.cells[0]) != cells:
+            self.keys = ZobristKeys(cells, len(game.players))
+            self.table.clear()
+        self.seat = state.currentTurn
+        self.nodes = 0
+        start = time.perf_counter()
+        self.deadline = start + self.time_limit
+        key = self.keys.hash(state)
+        moves = self.candidateMoves(state)
+        if not moves:
+            self.lastSearch = {}
+            return None
+        best = moves[0]
+        score = 0
+        completed = 0
+        max_depth = self.max_depth or len(moves)
+        for depth in range(1, max_depth + 1):
+            self.killers = [[] for i in range(depth + 1)]
+            try:
+                score, move = self.search(state, depth, -WIN * 2, WIN * 2, key, 0)
+            except SearchTimeout:
+                break
+            if move is not None:
+                best = move
+            completed = depth
+            # stop once a forced result has been found
+            if abs(score) > WIN // 2:
+                break
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        self.lastSearch = {"depth": completed, "nodes": self.nodes, "time": elapsed, "nps": self.nodes / elapsed,
+                           "score": score, "table_hits": self.table.hits, "table_misses": self.table.misses,
+                           "table_evictions": self.table.evictions}
+        if self.cache is not None:
+            stats = self.cache.stats()
+            self.lastSearch.update({"cache_hits": stats["hits"], "cache_misses": stats["misses"],
+                                    "cache_evictions": stats["evictions"]})
+        return best
+
+    def search(self, state, depth, alpha, beta, key, ply):
+        """Searches state to depth, returning (score, best_move) from self.seat's point of view."""
+        self.nodes += 1
+        if self.nodes & 1023 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if state.winner != -1:
+            return (WIN - ply if state.winner == self.seat else ply - WIN), None
+        if state.isDraw():
+            return 0, None
+        if depth == 0:
+            return self.evaluate(state), None
+
+        original_alpha, original_beta = alpha, beta
+        entry = self.table.get(key)
+        table_move = None
+        cache_key = None
+        if entry is None and self.cache is not None and depth >= self.cache_depth:
+            # canonicalising is slower than a table lookup, so only check the cache once the table has missed
+            cache_key, symmetry = self.cache.key(state, self.seat)
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                entry_depth, entry_score, flag, move = entry
+                if move is not None:
+                    move = self.cache.fromCanonical(state, move, symmetry)
+                entry = (entry_depth, entry_score, flag, move)
+        if entry is not None:
+            entry_depth, entry_score, flag, table_move = entry
+            entry_score = fromStored(entry_score, ply)
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return entry_score, table_move
+                elif flag == LOWER:
+                    alpha = max(alpha, entry_score)
+                else:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    return entry_score, table_move
+
+        mover = state.currentTurn
+        maximising = mover == self.seat
+        best_score = -WIN * 2 if maximising else WIN * 2
+        best_move = None
+        turn_keys = self.keys.turns
+        mover_keys = self.keys.cells[mover]
+        for cell in self.orderMoves(state, table_move, ply):
+            # moves are made and unmade on the one state rather than copying it. A timeout leaves it part way
+            # through, but chooseMove throws the state away then anyway
+            state.playCell(cell, mover)
+            child_key = key ^ mover_keys[cell] ^ turn_keys[mover] ^ turn_keys[state.currentTurn]
+            score = self.search(state, depth - 1, alpha, beta, child_key, ply + 1)[0]
+            state.unplayCell()
+            if maximising:
+                if score > best_score:
+                    best_score, best_move = score, cell
+                alpha = max(alpha, score)
+            else:
+                if score < best_score:
+                    best_score, best_move = score, cell
+                beta = min(beta, score)
+            if alpha >= beta:
+                killers = self.killers[ply]
+                if cell not in killers:
+                    killers.insert(0, cell)
+                    del killers[2:]
+                break
+
+        if best_score <= original_alpha:
+            flag = UPPER
+        elif best_score >= original_beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.store(key, depth, toStored(best_score, ply), flag, best_move)
+        if cache_key is not None:
+            move = None if best_move is None else self.cache.toCanonical(state, best_move, symmetry)
+            self.cache.store(cache_key, (depth, toStored(best_score, ply), flag, move))
+        return best_score, best_move
+
+    def candidateMoves(self, state):
+        """Returns the cells worth searching, ordered with the cells in the most lines first."""
+        if isinstance(state, BitboardEngine):
+            cells = state.legalCells()
+            lines = state.cellLines
+        else:
+            cells = nearbyCells(state)
+            lines = state.lines.cellLines if isinstance(state.lines, LineIndex) else None
+        if lines is not None:
+            cells.sort(key=lambda cell: -len(lines[cell]))
+        return cells
+
+    def orderMoves(self, state, table_move, ply):
+        """Returns the candidate moves, trying the transposition table's best move and then killer moves first."""
+        moves = self.candidateMoves(state)
+        first = [table_move] if table_move is not None else []
+        first += [cell for cell in self.killers[ply] if cell != table_move]
+        if not first:
+            return moves
+        legal = set(moves)
+        first = [cell for cell in first if cell in legal]
+        return first + [cell for cell in moves if cell not in first]
+
+    def evaluate(self, state):
+        """Scores lines that only one player has markers in, positive for self.seat and negative for opponents."""
+        score = 0
+        me = self.seat
+        if isinstance(state, BitboardEngine):
+            boards = state.boards
+            for mask in state.lineMasks:
+                owner = -1
+                count = 0
+                for player in range(len(boards)):
+                    markers = boards[player] & mask
+                    if markers:
+                        if owner != -1:
+                            owner = -2
+                            break
+                        owner = player
+                        count = bin(markers).count("1")
+                if owner >= 0:
+                    weight = lineWeights[min(count, len(lineWeights) - 1)]
+                    score += weight if owner == me else -weight
+        elif isinstance(state.lines, LineIndex):
+            counts = state.lines.counts
+            for line in range(len(state.lines.lines)):
+                owner = -1
+                count = 0
+                for player in range(len(state.players)):
+                    if counts[player][line]:
+                        if owner != -1:
+                            owner = -2
+                            break
+                        owner = player
+                        count = counts[player][line]
+                if owner >= 0:
+                    weight = lineWeights[min(count, len(lineWeights) - 1)]
+                    score += weight if owner == me else -weight
+        return score
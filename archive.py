@@ -0,0 +1,160 @@
+import mmap
+import os
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from savegame import Record, readHeader, header, playerHeader, cellTypecode
+
+indexMagic = b"3DNI"
+indexVersion = 1
+indexHeader = struct.Struct("<4sBxxx")
+# offset of the record, x, y, z, players, winner
+indexEntry = struct.Struct("<QHHHHh2x")
+if numpy is not None:
+    indexType = numpy.dtype([("offset", "<u8"), ("x", "<u2"), ("y", "<u2"), ("z", "<u2"), ("players", "<u2"),
+                             ("winner", "<i2"), ("padding", "V2")])
+
+
+def indexPath(path):
+    return path + ".idx"
+
+
+class ArchiveWriter:
+    """Appends games to an archive, creating it if it doesn't exist. An archive is a file of savegame records one after
+    another, along with an index file holding the offset, board size, player count and winner of every record."""
+
+    def __init__(self, path):
+        self.path = path
+        new = not os.path.exists(indexPath(path))
+        self.records = open(path, "ab")
+        self.index = open(indexPath(path), "ab")
+        if new:
+            self.index.write(indexHeader.pack(indexMagic, indexVersion))
+        self.offset = self.records.tell()
+
+    def append(self, game):
+        """Adds game, which can be a savegame.Record, an Engine or a Match."""
+        record = game if isinstance(game, Record) else Record.fromGame(game)
+        data = record.encode()
+        self.records.write(data)
+        self.index.write(indexEntry.pack(self.offset, record.x, record.y, record.z, len(record.players),
+                                         max(record.winner, -1)))
+        self.offset += len(data)
+
+    def close(self):
+        self.records.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+
+def mapFile(path):
+    """Maps path into memory read-only. Empty files can't be mapped, so give an empty bytes instead."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Archive:
+    """Read-only access to an archive written by ArchiveWriter. Both files are memory-mapped, so only the games which
+    are actually read are loaded from disk, and game n can be found straight from the index."""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = mapFile(path)
+        self.index = mapFile(indexPath(path))
+        if len(self.index) < indexHeader.size:
+            raise ValueError("Not a game archive index")
+        magic, version = indexHeader.unpack_from(self.index)
+        if magic != indexMagic:
+            raise ValueError("Not a game archive index")
+        if version != indexVersion:
+            raise ValueError("Unsupported game archive version: " + str(version))
+        self.count = (len(self.index) - indexHeader.size) // indexEntry.size
+        self.entries = None
+        if numpy is not None and self.count:
+            self.entries = numpy.frombuffer(self.index, indexType, self.count, indexHeader.size)
+
+    def __len__(self):
+        return self.count
+
+    def entry(self, n):
+        """Returns the index entry for game n, as (offset, x, y, z, players, winner)."""
+        if n < 0:
+            n += self.count
+        if not 0 <= n < self.count:
+            raise IndexError("Game " + str(n) + " isn't in the archive")
+        return indexEntry.unpack_from(self.index, indexHeader.size + n * indexEntry.size)
+
+    def __getitem__(self, n):
+        """Returns game n as a savegame.Record."""
+        return Record.decode(self.records, self.entry(n)[0])[0]
+
+    def __iter__(self):
+        """Yields every game in order as a savegame.Record."""
+        for n in range(self.count):
+            yield self[n]
+
+    def replay(self, n, moves=None, backend=None):
+        """Returns an Engine with the position of game n after the first moves moves, or all of them."""
+        return self[n].createEngine(moves, backend)
+
+    def moves(self, n):
+        """Yields (cell, player) for every move of game n, reading them one at a time without building the
+        position."""
+        offset = self.entry(n)[0]
+        fields = readHeader(self.records, offset)
+        offset += header.size
+        # the moves come after the players, whose names vary in length
+        for seat in range(fields["players"]):
+            offset += playerHeader.size + playerHeader.unpack_from(self.records, offset)[4]
+        move = struct.Struct("<" + cellTypecode(fields["x"] * fields["y"] * fields["z"]))
+        for turn in range(fields["moves"]):
+            yield move.unpack_from(self.records, offset + turn * move.size)[0], turn % fields["players"]
+
+    def filter(self, size=None, players=None, winner=None):
+        """Yields the number of every game matching all of the arguments given, where size is (x, y, z). Only the
+        index is read."""
+        if self.entries is not None:
+            matches = numpy.ones(self.count, bool)
+            if size is not None:
+                matches &= (self.entries["x"] == size[0]) & (self.entries["y"] == size[1]) & \
+                           (self.entries["z"] == size[2])
+            if players is not None:
+                matches &= self.entries["players"] == players
+            if winner is not None:
+                matches &= self.entries["winner"] == winner
+            for n in numpy.flatnonzero(matches).tolist():
+                yield n
+            return
+        entries = indexEntry.iter_unpack(self.index[indexHeader.size:indexHeader.size + self.count * indexEntry.size])
+        for n, (offset, x, y, z, count, won) in enumerate(entries):
+            if size is not None and (x, y, z) != tuple(size):
+                continue
+            if players is not None and count != players:
+                continue
+            if winner is not None and won != winner:
+                continue
+            yield n
+
+    def close(self):
+        # the numpy view has to go before the map it points into can be closed
+        self.entries = None
+        for data in (self.records, self.index):
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
@@ -0,0 +1,243 @@
+"""Micro-benchmarks for the game logic, on boards from 3x3x3 up to 64x64x64 with and without wrapping.
+
+Example:
+    python benchmarks/bench_engine.py --size 3 --size 16 --wrapping both -o engine.jsonl
+
+Runs without a display. For every board, times:
+    makeMove            a move in a position from a random game, taken back with unplayCell so every call is the same
+    checkForWin worst   a cell in the middle of a complete line as long as the board is tall
+    checkForWin random  random cells and players in the random position
+    checkForWrap        positions one step outside the board on every side
+    getLayer            every layer in turn
+    translateMove       directions converted from the camera's orientation, as the 3d view does
+    moveSelection       the cursor moved in every direction in turn
+    playout             a random game from an empty board, taken back afterwards
+
+Each is reported as operations per second, with the Vector3d objects created, the peak memory allocated while running
+and the memory still held afterwards, per operation. Playouts are also reported as moves per second. Results can be
+written as lines of JSON, so runs can be compared."""
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, root)
+
+from bench_vector import CountCreated
+from engine import Engine
+from simulate import parseSize
+from vector import Vector3d, Position3d
+
+# the game script's name isn't a valid module name, so it's loaded from its path. Its window is only opened under
+# __main__, so this only defines Match
+spec = importlib.util.spec_from_file_location("game", os.path.join(root, "3dNaughtsAndCrosses.py"))
+game = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(game)
+
+
+def cycle(items):
+    # returns a function which gives the next item of items each call, forever
+    items = list(items)
+    state = [0]
+
+    def advance():
+        item = items[state[0]]
+        state[0] = (state[0] + 1) % len(items)
+        return item
+    return advance
+
+
+def randomPosition(engine, rng):
+    """Plays random moves until the next one would win, leaving a position from late in a random game."""
+    cells = list(range(engine.x * engine.y * engine.z))
+    rng.shuffle(cells)
+    for cell in cells:
+        engine.playCell(cell, engine.currentTurn)
+        if engine.winner != -1:
+            engine.unplayCell()
+            break
+    return engine
+
+
+def makeMoveCase(engine, rng):
+    empty = engine.legalCells()
+    positions = cycle(Position3d(*engine.grid.coordinates(cell)) for cell in rng.sample(empty, min(len(empty), 64)))
+
+    def run():
+        engine.makeMove(positions(), engine.currentTurn)
+        engine.unplayCell()
+    return run
+
+
+def worstWinCase(x, y, z, wrapping, backend):
+    # the longest line on the board which the player has just completed, so every cell of it is checked and returned
+    engine = Engine(x, y, z, 2, wrapping, y, backend)
+    for level in range(y):
+        engine.setCell(engine.grid.index(x // 2, level, z // 2), 0)
+    point = Position3d(x // 2, y // 2, z // 2)
+
+    def run():
+        engine.checkForWin(point, 0)
+    return run
+
+
+def randomWinCase(engine, rng):
+    cells = [rng.randrange(engine.x * engine.y * engine.z) for i in range(256)]
+    checks = cycle((Position3d(*engine.grid.coordinates(cell)), rng.randrange(len(engine.players))) for cell in cells)
+
+    def run():
+        point, player = checks()
+        engine.checkForWin(point, player)
+    return run
+
+
+def wrapCase(engine):
+    x, y, z = engine.x, engine.y, engine.z
+    outside = cycle([(x, y // 2, z // 2), (-1, y // 2, z // 2), (x // 2, y, z // 2), (x // 2, -1, z // 2),
+                     (x // 2, y // 2, z), (x // 2, y // 2, -1)])
+    position = Position3d(0, 0, 0)
+
+    def run():
+        # checkForWrap moves the position back inside when wrapping, so it's set outside again every call
+        position.x, position.y, position.z = outside()
+        engine.checkForWrap(position)
+    return run
+
+
+def layerCase(engine):
+    layers = cycle(range(engine.y))
+
+    def run():
+        engine.getLayer(layers())
+    return run
+
+
+def createMatch(x, y, z, wrapping, backend):
+    match = game.Match(x, y, z, 1, game.createPlayers(2, 0), wrapping, True, 3, backend)
+    match.start()
+    # turned so the directions don't line up with the grid's axes
+    match.camera.move((130, -25), 0)
+    return match
+
+
+def translateCase(match):
+    directions = cycle(game.directions)
+
+    def run():
+        match.translateMove(directions())
+    return run
+
+
+def selectionCase(match):
+    # back and forth along every axis, so the cursor also reaches the edges and wraps
+    directions = cycle(["Right", "Right", "Up", "Forward", "Left", "Down", "Backward", "Left", "Left", "Down"])
+
+    def run():
+        match.moveSelection(directions())
+    return run
+
+
+def playoutCase(engine, rng, played):
+    # orders are shuffled beforehand, as shuffling every cell of a large board takes longer than most games
+    orders = cycle([rng.sample(range(engine.x * engine.y * engine.z), engine.x * engine.y * engine.z)
+                    for i in range(8)])
+
+    def run():
+        for cell in orders():
+            engine.playCell(cell, engine.currentTurn)
+            if engine.winner != -1 or engine.isDraw():
+                break
+        played[0] += 1
+        played[1] += len(engine.moves)
+        while engine.moves:
+            engine.unplayCell()
+    return run
+
+
+def measure(function, traced=10000):
+    """Returns seconds per call, and the Vector3d objects created, peak bytes allocated and bytes kept per call."""
+    timer = timeit.Timer(function)
+    number = timer.autorange()[0]
+    seconds = min(timer.repeat(repeat=3, number=number)) / number
+
+    calls = min(number, traced)
+    with CountCreated(Vector3d) as counter:
+        for i in range(calls):
+            function()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    peak = 0
+    for i in range(calls):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        function()
+        peak += tracemalloc.get_traced_memory()[1] - current
+    kept = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return seconds, counter.count / calls, peak / calls, kept / calls
+
+
+def runBoard(x, y, z, wrapping, backend, seed):
+    """Yields (name, function, played) for every case on one board. played is [games, moves] played by function so
+    far for playouts, and None otherwise."""
+    rng = random.Random(seed)
+    position = randomPosition(Engine(x, y, z, 2, wrapping, 3, backend), rng)
+    yield "makeMove", makeMoveCase(position, rng), None
+    yield "checkForWin worst", worstWinCase(x, y, z, wrapping, backend), None
+    yield "checkForWin random", randomWinCase(position, rng), None
+    yield "checkForWrap", wrapCase(position), None
+    yield "getLayer", layerCase(position), None
+    match = createMatch(x, y, z, wrapping, backend)
+    yield "translateMove", translateCase(match), None
+    yield "moveSelection", selectionCase(match), None
+    played = [0, 0]
+    yield "playout", playoutCase(Engine(x, y, z, 2, wrapping, 3, backend), rng, played), played
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Times the game logic on boards of different sizes.")
+    parser.add_argument("--size", type=parseSize, action="append",
+                        help="board size as XxYxZ, can be given more than once (default 3, 4, 5, 8, 16, 32 and 64)")
+    parser.add_argument("--wrapping", choices=("off", "on", "both"), default="both")
+    parser.add_argument("--backend", choices=("list", "numpy"), action="append",
+                        help="grid backend, can be given more than once (default numpy when it's installed)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default=None, help="file to write JSON Lines results to")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w") if args.output else None
+    wrapping = {"off": [False], "on": [True], "both": [False, True]}[args.wrapping]
+    print("{:<10} {:>8} {:>7} {:<20} {:>12} {:>11} {:>10} {:>10} {:>10}".format(
+        "Size", "Wrapping", "Backend", "Operation", "Ops/s", "Moves/s", "Vectors", "Peak B", "Kept B"))
+    try:
+        for size in args.size or [(n, n, n) for n in (3, 4, 5, 8, 16, 32, 64)]:
+            for wraps in wrapping:
+                for backend in args.backend or [None]:
+                    for name, function, played in runBoard(*size, wraps, backend, args.seed):
+                        seconds, vectors, peak, kept = measure(function)
+                        result = {"x": size[0], "y": size[1], "z": size[2], "wrapping": wraps,
+                                  "backend": backend or "default", "operation": name, "ops_per_second": 1 / seconds,
+                                  "vectors_per_op": vectors, "peak_bytes_per_op": peak, "kept_bytes_per_op": kept}
+                        moves = ""
+                        if played is not None:
+                            # every game played is counted, including the timing runs, for the average length
+                            result["moves_per_second"] = played[1] / played[0] / seconds
+                            moves = "{:.0f}".format(result["moves_per_second"])
+                        print("{:<10} {:>8} {:>7} {:<20} {:>12.0f} {:>11} {:>10.2f} {:>10.0f} {:>10.0f}".format(
+                            "x".join(str(side) for side in size), "on" if wraps else "off", result["backend"], name,
+                            1 / seconds, moves, vectors, peak, kept))
+                        if out is not None:
+                            out.write(json.dumps(result) + "\n")
+    finally:
+        if out is not None:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Benchmark of drawing the 3d view, over a matrix of board settings and a fixed camera path.
+
+Example:
+    python benchmarks/bench_render.py --size 3 --size 8 --lod 0 --lod 3 --solid both --wrapping both -o render.jsonl
+
+Runs without a display. For every combination of size, explosion, LoD, solid cubes and wrapping, a board is filled
+with the same random markers, then the camera orbits it once through Camera.move while Match.renderIn3d draws each
+frame. The orbit is run twice: once timed, then again with tracemalloc to find the peak memory, since tracing slows
+drawing down. Each result is written as a line of JSON, and a summary is printed at the end."""
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, root)
+
+import pygame
+
+import render
+from simulate import parseSize
+
+# the game script's name isn't a valid module name, so it's loaded from its path. Its window is only opened under
+# __main__, so this only defines Match and the caches
+spec = importlib.util.spec_from_file_location("game", os.path.join(root, "3dNaughtsAndCrosses.py"))
+game = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(game)
+
+
+def createMatch(settings, fill, seed):
+    """Returns a started match with fill of its cells taken at random, the same for every run with the same seed."""
+    x, y, z, explosion, lod, solid, wrapping, sorting, vectorised = settings
+    match = game.Match(x, y, z, explosion, game.createPlayers(2, 0), wrapping, True, 3)
+    match.start()
+    cells = list(range(x * y * z))
+    random.Random(seed).shuffle(cells)
+    # put straight into the grid, as a board this full would usually have been won already, and only drawing is timed
+    for i, cell in enumerate(cells[:round(len(cells) * fill)]):
+        match.grid.flat[cell] = i % len(match.players)
+    match.solid_cubes = solid
+    match.camera.sorting = sorting
+    match.camera.vectorised = vectorised
+    if lod != "auto":
+        # limits which are never crossed keep the level fixed
+        match.lod = lod
+        match.detail = render.DetailController(match.detail.levels, slow=math.inf, fast=0)
+    return match
+
+
+def orbit(frames, pitch=20):
+    """Yields the Camera.move arguments for one turn around the target, rising and falling by pitch degrees."""
+    for frame in range(frames):
+        before = math.sin(2 * math.pi * frame / frames)
+        after = math.sin(2 * math.pi * (frame + 1) / frames)
+        yield (360 / frames, (after - before) * pitch), 0
+
+
+def runOrbit(match, width, height, frames):
+    """Draws the first frame, then one frame for every step of the orbit. Returns the time of the first frame, which
+    builds the grid and markers, and of every frame after it."""
+    screen = pygame.Surface((width, height))
+    start = time.perf_counter()
+    screen.blit(match.renderIn3d(width, height), (0, 0))
+    first = time.perf_counter() - start
+    times = []
+    for diff, zoom in orbit(frames):
+        match.camera.move(diff, zoom)
+        start = time.perf_counter()
+        screen.blit(match.renderIn3d(width, height), (0, 0))
+        # the detail controller reads the frame time from the camera's clock
+        match.camera.clock.tick()
+        times.append(time.perf_counter() - start)
+    return first, times
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def runCase(settings, args):
+    x, y, z, explosion, lod, solid, wrapping, sorting, vectorised = settings
+    # a fresh grid cache, so every case builds its own grid in the first frame
+    game.gridCache = render.LayerCache(8)
+    match = createMatch(settings, args.fill, args.seed)
+    first, times = runOrbit(match, args.width, args.height, args.frames)
+    lastFrame = match.camera.lastFrame
+
+    peak = None
+    if not args.no_memory:
+        game.gridCache = render.LayerCache(8)
+        match = createMatch(settings, args.fill, args.seed)
+        tracemalloc.start()
+        runOrbit(match, args.width, args.height, args.frames)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    ordered = sorted(times)
+    return {"x": x, "y": y, "z": z, "explosion": explosion, "lod": lod, "final_lod": match.lod,
+            "solid_cubes": solid, "wrapping": wrapping, "sorting": sorting,
+            "renderer": "numpy" if vectorised and render.numpy is not None else "python",
+            "width": args.width, "height": args.height, "frames": len(times), "fill": args.fill,
+            "fps": len(times) / sum(times), "first_frame": first, "mean": sum(times) / len(times),
+            "p50": percentile(ordered, 0.5), "p90": percentile(ordered, 0.9), "p99": percentile(ordered, 0.99),
+            "max": ordered[-1], "peak_bytes": peak, "objects": lastFrame.get("objects"),
+            "faces": lastFrame.get("faces")}
+
+
+def createCases(args):
+    switches = {"off": [False], "on": [True], "both": [False, True]}
+    for size in args.size or [(3, 3, 3), (5, 5, 5), (8, 8, 8)]:
+        for explosion in args.explosion or [1.0, 2.0]:
+            for lod in args.lod or [0, 3]:
+                for solid in switches[args.solid]:
+                    for wrapping in switches[args.wrapping]:
+                        for sorting in args.sorting or [render.OBJECT_SORT]:
+                            yield size + (explosion, lod, solid, wrapping, sorting, not args.python)
+
+
+def printSummary(results, out):
+    header = "{:<10} {:>9} {:>4} {:>5} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>10}".format(
+        "Size", "Explosion", "LoD", "Solid", "Wrapping", "FPS", "p50 ms", "p90 ms", "p99 ms", "First ms", "Peak KiB")
+    print(header, file=out)
+    for result in results:
+        peak = "-" if result["peak_bytes"] is None else "{:.0f}".format(result["peak_bytes"] / 1024)
+        print("{:<10} {:>9} {:>4} {:>5} {:>8} {:>8.1f} {:>8.2f} {:>8.2f} {:>8.2f} {:>8.1f} {:>10}".format(
+            "x".join(str(result[axis]) for axis in "xyz"), result["explosion"], result["lod"],
+            "on" if result["solid_cubes"] else "off", "on" if result["wrapping"] else "off", result["fps"],
+            result["p50"] * 1000, result["p90"] * 1000, result["p99"] * 1000, result["first_frame"] * 1000, peak),
+            file=out)
+
+
+def parseLod(text):
+    if text == "auto":
+        return text
+    lod = int(text)
+    # Match draws levels 0 to 4
+    if not 0 <= lod < 5:
+        raise argparse.ArgumentTypeError("unknown level of detail: " + text)
+    return lod
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Times drawing the 3d view while orbiting the camera.")
+    parser.add_argument("--size", type=parseSize, action="append",
+                        help="board size as XxYxZ, can be given more than once (default 3, 5 and 8)")
+    parser.add_argument("--explosion", type=float, action="append",
+                        help="gap between layers, can be given more than once (default 1 and 2)")
+    parser.add_argument("--lod", type=parseLod, action="append",
+                        help="level of detail from 0 to 4, or auto to let it change with the frame time, can be "
+                             "given more than once (default 0 and 3)")
+    parser.add_argument("--solid", choices=("off", "on", "both"), default="both", help="solid cubes")
+    parser.add_argument("--wrapping", choices=("off", "on", "both"), default="both")
+    parser.add_argument("--sorting", choices=render.sortModes, action="append",
+                        help="how faces are layered, can be given more than once (default objects)")
+    parser.add_argument("--python", action="store_true", help="use the per-object renderer rather than numpy")
+    parser.add_argument("--frames", type=int, default=60, help="frames in one orbit")
+    parser.add_argument("--width", type=int, default=800)
+    parser.add_argument("--height", type=int, default=600)
+    parser.add_argument("--fill", type=float, default=0.3, help="fraction of cells with a marker in")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the second orbit which measures memory")
+    parser.add_argument("-o", "--output", default="-", help="file to write JSON Lines results to (default stdout)")
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    # keep the summary out of the results when they're written to stdout
+    report = sys.stderr if out is sys.stdout else sys.stdout
+    environment = {"python": platform.python_version(), "pygame": pygame.version.ver,
+                   "numpy": render.numpy.__version__ if render.numpy is not None else None,
+                   "machine": platform.machine(), "time": time.time()}
+    results = []
+    try:
+        for settings in createCases(args):
+            result = runCase(settings, args)
+            result.update(environment)
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            results.append(result)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    printSummary(results, report)
+
+
+if __name__ == "__main__":
+    main()
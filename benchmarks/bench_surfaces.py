@@ -0,0 +1,63 @@
+"""Benchmark of the surfaces allocated while drawing frames of the 3d view, with and without reusing them.
+
+Run from anywhere with `python benchmarks/bench_surfaces.py`. Renders frames of a match the way the game loop does,
+with the FPS counter shown, first allocating a new canvas and rendering the text every frame as the game used to, then
+with the surface pool and text cache. Each case is run at a fixed window size, and while the window is resized back
+and forth. Prints the time per frame and the number of surfaces allocated per frame."""
+import importlib.util
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, root)
+
+import pygame
+
+import render
+import UI
+
+# the game script's name isn't a valid module name, so it's loaded from its path. Its window is only opened under
+# __main__, so this only defines Match and the caches
+spec = importlib.util.spec_from_file_location("game", os.path.join(root, "3dNaughtsAndCrosses.py"))
+game = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(game)
+
+
+def run(name, pooled, sizes, frames):
+    game.surfacePool = render.SurfacePool(4 if pooled else 0)
+    text = UI.TextCache(pygame.font.SysFont("Arial", 36, bold=True), 32 if pooled else 0)
+    match = game.Match(3, 3, 3, 1, game.createPlayers(2, 0), False, True, 3)
+    screen = pygame.Surface(max(sizes))
+    # warm up, so building the grid isn't counted
+    for size in sizes:
+        match.render(*size)
+
+    start = time.perf_counter()
+    created = game.surfacePool.created + text.created
+    for frame in range(frames):
+        size = sizes[frame // 10 % len(sizes)]
+        screen.blit(match.render(*size), (0, 0))
+        # get_fps only changes every 10 ticks, so the counter does too
+        fps = str(60 + frame // 10 % 5) + " / " + str(match.lod)
+        screen.blit(text.render(fps, True, pygame.Color("RED")), (0, 0))
+        match.camera.move((1, 0), 0)
+    seconds = (time.perf_counter() - start) / frames
+    created = game.surfacePool.created + text.created - created
+    print("{:<30} {:>9.3f} ms/frame {:>9.2f} surfaces/frame".format(name, seconds * 1e3, created / frames))
+    return seconds
+
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    frames = 500
+    for name, sizes in (("1280x720", [(1280, 720)]), ("resizing", [(1280, 720), (800, 600), (1920, 1080)])):
+        before = run(name + " allocating", False, sizes, frames)
+        after = run(name + " pooled", True, sizes, frames)
+        print("{:<30} {:>9.2f}x faster".format("", before / after))
+
+
+if __name__ == "__main__":
+    main()
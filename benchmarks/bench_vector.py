@@ -0,0 +1,250 @@
+"""Micro-benchmarks for vector.py, comparing it to the original Vector3d (copied below as the baseline).
+
+Run from anywhere with `python benchmarks/bench_vector.py`. For each case, prints the time per call, the number of
+vectors created per call and the peak memory traced while running it."""
+import math
+import os
+import sys
+import timeit
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import engine
+import render
+from vector import Vector3d, Rotation3d, Position3d
+
+
+class LegacyVector3d:
+    # Vector3d as it was before __slots__, in-place operators and cached rotation matrices
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    def clone(self):
+        return __class__(self.x, self.y, self.z)
+
+    def __add__(self, addition):
+        if isinstance(addition, int) or isinstance(addition, float):
+            return __class__(self.x + addition, self.y + addition, self.z + addition)
+        else:
+            return __class__(self.x + addition.x, self.y + addition.y, self.z + addition.z)
+
+    def __sub__(self, subtraction):
+        if isinstance(subtraction, int) or isinstance(subtraction, float):
+            return __class__(self.x - subtraction, self.y - subtraction, self.z - subtraction)
+        else:
+            return __class__(self.x - subtraction.x, self.y - subtraction.y, self.z - subtraction.z)
+
+    def __mul__(self, mult):
+        if isinstance(mult, int) or isinstance(mult, float):
+            return __class__(self.x * mult, self.y * mult, self.z * mult)
+        else:
+            return __class__(self.x * mult.x, self.y * mult.y, self.z * mult.z)
+
+    def magnitude(self):
+        return math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
+
+    def rotateX(self, theta):
+        y = self.y * math.cos(theta) - self.z * math.sin(theta)
+        z = self.z * math.cos(theta) + self.y * math.sin(theta)
+        self.y, self.z = y, z
+
+    def rotateY(self, theta):
+        x = self.x * math.cos(theta) - self.z * math.sin(theta)
+        z = self.z * math.cos(theta) + self.x * math.sin(theta)
+        self.x, self.z = x, z
+
+    def rotateZ(self, theta):
+        x = self.x * math.cos(theta) - self.y * math.sin(theta)
+        y = self.y * math.cos(theta) + self.x * math.sin(theta)
+        self.x, self.y = x, y
+
+    def modifyAxes(self, rotation):
+        self.rotateX(rotation.x)
+        self.rotateY(rotation.y)
+        self.rotateZ(rotation.z)
+        return self
+
+
+class LegacyRotation3d(LegacyVector3d):
+
+    def __init__(self, x, y, z):
+        super().__init__(math.radians(x), math.radians(y), math.radians(z))
+
+
+class LegacyPosition3d(LegacyVector3d):
+    pass
+
+
+class CountCreated:
+    # counts every instance of cls, or its subclasses, created inside the with block by wrapping their __init__
+
+    def __init__(self, cls):
+        self.classes = [cls] + cls.__subclasses__()
+        self.originals = {}
+        self.count = 0
+        self.depth = 0
+
+    def __enter__(self):
+        for cls in self.classes:
+            if "__init__" in cls.__dict__:
+                self.originals[cls] = cls.__init__
+                cls.__init__ = self.wrap(cls.__init__)
+        return self
+
+    def wrap(self, init):
+        def counting(vector, *args, **kwargs):
+            # a subclass calling super().__init__ is still only one vector
+            if self.depth == 0:
+                self.count += 1
+            self.depth += 1
+            try:
+                init(vector, *args, **kwargs)
+            finally:
+                self.depth -= 1
+        return counting
+
+    def __exit__(self, *exception):
+        for cls, init in self.originals.items():
+            cls.__init__ = init
+
+
+def measure(name, function, base, number):
+    seconds = min(timeit.repeat(function, number=number, repeat=5)) / number
+    with CountCreated(base) as counter:
+        function()
+    tracemalloc.start()
+    for i in range(number):
+        function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print("{:<40} {:>9.3f} us {:>9} vectors {:>9} peak bytes".format(name, seconds * 1e6, counter.count, peak))
+    return seconds
+
+
+def legacyApplyZoomAndOrientation(camera):
+    # Camera.apply_zoom_and_orientation as it was before the rotation matrix was shared, rotating each axis in turn
+    camera.position = camera.target - LegacyPosition3d(0, 0, camera.zoom_linearity**(camera.zoom)).modifyAxes(
+        camera.orientation)
+    camera.xaxis = LegacyPosition3d(1, 0, 0).modifyAxes(camera.orientation)
+    camera.yaxis = LegacyPosition3d(0, 1, 0).modifyAxes(camera.orientation)
+    camera.zaxis = LegacyPosition3d(0, 0, 1).modifyAxes(camera.orientation)
+
+
+def cameraCase(legacy):
+    camera = render.Camera()
+    if legacy:
+        camera.target = LegacyPosition3d(0, 0, 0)
+        camera.orientation = LegacyRotation3d(20, 35, 0)
+    else:
+        camera.target = Position3d(0, 0, 0)
+        camera.orientation = Rotation3d(20, 35, 0)
+
+    def run():
+        if legacy:
+            legacyApplyZoomAndOrientation(camera)
+        else:
+            camera.apply_zoom_and_orientation()
+    return run
+
+
+def legacyCheckForWin(game, point_to_check, player):
+    # Match.checkForWin as it was before the line index, walking out from the point with vectors. Only finds 3 in a row
+    directions = [LegacyPosition3d(0, 0, 1), LegacyPosition3d(0, 1, 0), LegacyPosition3d(1, 0, 0),
+                  LegacyPosition3d(1, 0, 1), LegacyPosition3d(0, 1, 1), LegacyPosition3d(1, 1, 0),
+                  LegacyPosition3d(1, 1, 1), LegacyPosition3d(-1, 0, 1), LegacyPosition3d(0, -1, 1),
+                  LegacyPosition3d(-1, 1, 0), LegacyPosition3d(1, 1, -1), LegacyPosition3d(1, -1, 1),
+                  LegacyPosition3d(-1, 1, 1)]
+
+    for direction in directions:
+        position = point_to_check.clone()
+        points = [position.clone()]
+
+        for i in range(2):
+            position += direction
+            temp = game.checkForWrap(position)
+            if temp is None:
+                position -= direction
+                break
+            position = temp
+            points.append(position.clone())
+            if game.grid[position.x][position.y][position.z] != player:
+                position -= direction
+                position = game.checkForWrap(position)
+                break
+        else:
+            return True, points, direction
+
+        points = [position.clone()]
+
+        for i in range(2):
+            position -= direction
+            temp = game.checkForWrap(position)
+            if temp is None:
+                break
+            position = temp
+            points.append(position.clone())
+            if game.grid[position.x][position.y][position.z] != player:
+                break
+        else:
+            return True, points, direction
+
+    return False, None, None
+
+
+def checkForWinCase(legacy, line):
+    # 3x3x3 with nested lists, the only board the old check worked on. With line, the point completes a column,
+    # otherwise it's a lone marker and every direction is checked
+    game = engine.Engine(3, 3, 3, 2, backend="list")
+    for y in range(3 if line else 1):
+        game.setCell(game.grid.index(1, y, 1), 0)
+    point = LegacyPosition3d(1, 0, 1) if legacy else Position3d(1, 0, 1)
+
+    def run():
+        if legacy:
+            legacyCheckForWin(game, point, 0)
+        else:
+            game.checkForWin(point, 0)
+    return run
+
+
+def arithmeticCase(vector):
+    a, b = vector(1.0, 2.0, 3.0), vector(0.5, 0.25, 0.125)
+
+    def run():
+        (a + b) * 2.0 - a
+    return run
+
+
+def inPlaceCase():
+    a, b = Vector3d(1.0, 2.0, 3.0), Vector3d(0.5, 0.25, 0.125)
+
+    def run():
+        a.__iadd__(b)
+        a.__imul__(0.5)
+    return run
+
+
+def main():
+    render.pygame.init()
+    print("bytes per vector: legacy {}, slots {}".format(
+        sys.getsizeof(LegacyVector3d(1, 2, 3)) + sys.getsizeof(LegacyVector3d(1, 2, 3).__dict__),
+        sys.getsizeof(Vector3d(1, 2, 3))))
+    print()
+    cases = [("arithmetic", arithmeticCase(LegacyVector3d), arithmeticCase(Vector3d), 200000),
+             ("Camera.apply_zoom_and_orientation", cameraCase(True), cameraCase(False), 50000),
+             ("Engine.checkForWin (3 in a row)", checkForWinCase(True, True), checkForWinCase(False, True), 50000),
+             ("Engine.checkForWin (no line)", checkForWinCase(True, False), checkForWinCase(False, False), 50000)]
+    for name, legacy, current, number in cases:
+        before = measure(name + " legacy", legacy, LegacyVector3d, number)
+        after = measure(name, current, Vector3d, number)
+        print("{:<40} {:>9.2f}x faster".format("", before / after))
+    measure("arithmetic in place", inPlaceCase(), Vector3d, 200000)
+
+
+if __name__ == "__main__":
+    main()
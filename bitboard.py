@@ -0,0 +1,170 @@
+from vector import Vector3d, Position3d
+from engine import Player
+from lines import LineIndex
+
+# every player's markers must fit in a 64 bit mask
+maxCells = 64
+
+# line masks shared between engines with the same board settings, keyed on (x, y, z, win_length, wrapping)
+tables = {}
+
+
+def lineTables(x, y, z, length, wrapping):
+    """Returns (index, masks, cellLines) for a board, building them on first use. masks[line] has a bit set for each
+    cell in the line, and cellLines[cell] is a tuple of (mask, line) for every line through cell."""
+    key = (x, y, z, length, wrapping)
+    if key not in tables:
+        index = LineIndex(x, y, z, length, wrapping, 0)
+        masks = [sum(1 << cell for cell in line) for line in index.lines]
+        cellLines = [tuple((masks[line], line) for line in lines) for lines in index.cellLines]
+        tables[key] = (index, masks, cellLines)
+    return tables[key]
+
+
+class BitboardEngine:
+    """The rules of a match on boards of up to 64 cells, storing each player's markers as a single int with one bit
+    per cell. Cells are numbered the same way as board.ListGrid, so Engine.playCell indices can be used directly.
+    Much faster than Engine for self-play and analysis, but has no grid for rendering."""
+
+    def __init__(self, x=3, y=3, z=3, players=2, wrapping=False, win_length=3):
+        if x * y * z > maxCells:
+            raise ValueError("Bitboards only support up to " + str(maxCells) + " cells")
+        if isinstance(players, int):
+            players = [Player() for i in range(players)]
+        self.winningLine = None
+        self.winningDirection = None
+        self.players = players
+        self.currentTurn = 0
+        self.x = x
+        self.y = y
+        self.z = z
+        self.wrapping = wrapping
+        self.win_length = win_length
+        self.lines, self.lineMasks, self.cellLines = lineTables(x, y, z, win_length, wrapping)
+        self.boards = [0] * len(players)
+        self.occupied = 0
+        self.full = (1 << (x * y * z)) - 1
+        self.winner = -1
+        self.moveCount = 0
+        self.moves = []
+
+    @classmethod
+    def fromEngine(cls, engine):
+        """Creates a bitboard copy of an Engine's current state."""
+        new = cls(engine.x, engine.y, engine.z, engine.players, engine.wrapping, engine.win_length)
+        for cell, player in enumerate(engine.grid.flat):
+            if player != -1:
+                new.boards[player] |= 1 << cell
+                new.occupied |= 1 << cell
+        new.currentTurn = engine.currentTurn
+        new.winner = engine.winner
+        new.winningLine = engine.winningLine
+        new.winningDirection = engine.winningDirection
+        new.moveCount = engine.moveCount
+        new.moves = engine.moves[:]
+        return new
+
+    def index(self, x, y, z):
+        return (x * self.y + y) * self.z + z
+
+    def cellOwner(self, cell):
+        """Returns the player with a marker at cell, or -1 if it's empty."""
+        bit = 1 << cell
+        if not self.occupied & bit:
+            return -1
+        for player in range(len(self.boards)):
+            if self.boards[player] & bit:
+                return player
+
+    def owners(self):
+        """Returns a list of the player in every cell, or -1 for empty cells."""
+        owners = [-1] * (self.x * self.y * self.z)
+        for player in range(len(self.boards)):
+            board = self.boards[player]
+            while board:
+                bit = board & -board
+                owners[bit.bit_length() - 1] = player
+                board ^= bit
+        return owners
+
+    def legalCells(self):
+        """Returns a list of every empty cell."""
+        empty = self.full & ~self.occupied
+        cells = []
+        while empty:
+            bit = empty & -empty
+            cells.append(bit.bit_length() - 1)
+            empty ^= bit
+        return cells
+
+    def makeMove(self, position, player):
+        """Attempts to put player's marker at position. If a valid move, will advance self.currentTurn and check for
+        victory. Returns whether the move was made."""
+        return self.playCell(self.index(position.x, position.y, position.z), player)
+
+    def playCell(self, cell, player):
+        """As makeMove, but takes a cell index rather than a position."""
+        if self.winner != -1 or self.occupied >> cell & 1:
+            return False
+        self.setCell(cell, player)
+        self.moves.append(cell)
+        self.nextTurn()
+        return True
+
+    def unplayCell(self):
+        """Takes back the last move made with playCell, returning its (cell, player)."""
+        cell = self.moves.pop()
+        player = self.cellOwner(cell)
+        bit = 1 << cell
+        self.boards[player] ^= bit
+        self.occupied ^= bit
+        self.moveCount -= 1
+        self.winner = -1
+        self.winningLine = None
+        self.winningDirection = None
+        self.currentTurn = (self.currentTurn - 1) % len(self.players)
+        return cell, player
+
+    def setCell(self, cell, player):
+        """Puts player's marker in an empty cell and checks for victory, without changing whose turn it is. Used
+        directly when setting up positions."""
+        bit = 1 << cell
+        board = self.boards[player] | bit
+        self.boards[player] = board
+        self.occupied |= bit
+        self.moveCount += 1
+        for mask, line in self.cellLines[cell]:
+            if board & mask == mask:
+                self.winner = player
+                game_won, self.winningLine, self.winningDirection = self.lineResult(line)
+                break
+
+    def checkForWin(self, point_to_check, player):
+        """Checks whether player has a line through point_to_check. Returns line_found, points_in_line, direction"""
+        board = self.boards[player]
+        for mask, line in self.cellLines[self.index(point_to_check.x, point_to_check.y, point_to_check.z)]:
+            if board & mask == mask:
+                return self.lineResult(line)
+        return False, None, None
+
+    def lineResult(self, line):
+        """Converts a line from self.lines into the line_found, points_in_line, direction format."""
+        # plain vectors, as the views test for cells with Vector3d(x, y, z) in points
+        points = [Vector3d(x, y, z) for x, y, z in self.lines.coordinates(line)]
+        return True, points, Position3d(*self.lines.direction(line))
+
+    def nextTurn(self):
+        self.currentTurn += 1
+        if self.currentTurn >= len(self.players):
+            self.currentTurn = 0
+
+    def isDraw(self):
+        """Returns whether every cell has been filled without anybody winning."""
+        return self.winner == -1 and self.occupied == self.full
+
+    def copy(self):
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new.boards = self.boards[:]
+        new.moves = self.moves[:]
+        return new
@@ -0,0 +1,165 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class ListGrid:
+    """Board stored as nested lists of ints, used when numpy isn't available. Cells hold the owning player, or -1 if
+    empty, and can be indexed as grid[x][y][z] as well as grid[x, y, z]. grid.flat gives the same cells by a single
+    index, as it does for NumpyGrid."""
+
+    def __init__(self, x, y, z, players=2):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.cells = [[[-1] * z for j in range(y)] for i in range(x)]
+        self.flat = FlatView(self)
+
+    def index(self, x, y, z):
+        """Converts grid coordinates to an index into self.flat."""
+        return (x * self.y + y) * self.z + z
+
+    def coordinates(self, index):
+        """Converts an index into self.flat back into grid coordinates."""
+        index, z = divmod(index, self.z)
+        x, y = divmod(index, self.y)
+        return x, y, z
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            x, y, z = key
+            return self.cells[x][y][z]
+        return self.cells[key]
+
+    def __setitem__(self, key, value):
+        x, y, z = key
+        self.cells[x][y][z] = value
+
+    def getLayer(self, y):
+        """Returns a copy of the slice at level y, indexed as layer[x][z]."""
+        return [column[y][:] for column in self.cells]
+
+    def occupied(self):
+        """Returns a flat list of booleans, True where a marker has been placed."""
+        return [cell != -1 for cell in self.flat]
+
+    def playerMask(self, player):
+        """Returns a flat list of booleans, True where player has placed a marker."""
+        return [cell == player for cell in self.flat]
+
+    def emptyCells(self):
+        """Returns a list of indices into self.flat for every empty cell."""
+        return [i for i, player in enumerate(self.flat) if player == -1]
+
+    def occupiedCells(self):
+        """Yields (x, y, z, player) for every occupied cell."""
+        for x, column in enumerate(self.cells):
+            for y, row in enumerate(column):
+                for z, player in enumerate(row):
+                    if player != -1:
+                        yield x, y, z, player
+
+    def copy(self):
+        new = self.__class__.__new__(self.__class__)
+        new.x, new.y, new.z = self.x, self.y, self.z
+        new.cells = [[row[:] for row in column] for column in self.cells]
+        new.flat = FlatView(new)
+        return new
+
+
+class FlatView:
+    """The cells of a ListGrid indexed by a single int, in the same order as NumpyGrid.flat."""
+
+    def __init__(self, grid):
+        self.grid = grid
+
+    def __len__(self):
+        return self.grid.x * self.grid.y * self.grid.z
+
+    def __getitem__(self, index):
+        rest, z = divmod(index, self.grid.z)
+        x, y = divmod(rest, self.grid.y)
+        return self.grid.cells[x][y][z]
+
+    def __setitem__(self, index, value):
+        rest, z = divmod(index, self.grid.z)
+        x, y = divmod(rest, self.grid.y)
+        self.grid.cells[x][y][z] = value
+
+    def __iter__(self):
+        for column in self.grid.cells:
+            for row in column:
+                yield from row
+
+
+class NumpyGrid:
+    """Board stored as one contiguous numpy array of shape (x, y, z). Uses int8 cells unless there are too many
+    players to fit, in which case int16 is used."""
+
+    def __init__(self, x, y, z, players=2):
+        self.x = x
+        self.y = y
+        self.z = z
+        dtype = numpy.int8 if players < 128 else numpy.int16
+        self.cells = numpy.full((x, y, z), -1, dtype)
+        # flat view sharing memory with self.cells
+        self.flat = self.cells.reshape(-1)
+
+    def index(self, x, y, z):
+        """Converts grid coordinates to an index into self.flat."""
+        return (x * self.y + y) * self.z + z
+
+    def coordinates(self, index):
+        """Converts an index into self.flat back into grid coordinates."""
+        index, z = divmod(index, self.z)
+        x, y = divmod(index, self.y)
+        return x, y, z
+
+    def __getitem__(self, key):
+        return self.cells[key]
+
+    def __setitem__(self, key, value):
+        self.cells[key] = value
+
+    def getLayer(self, y):
+        """Returns a view of the slice at level y, indexed as layer[x][z]. Writes to the view change the grid."""
+        return self.cells[:, y, :]
+
+    def occupied(self):
+        """Returns a boolean array of shape (x, y, z), True where a marker has been placed."""
+        return self.cells != -1
+
+    def playerMask(self, player):
+        """Returns a boolean array of shape (x, y, z), True where player has placed a marker."""
+        return self.cells == player
+
+    def emptyCells(self):
+        """Returns a list of indices into self.flat for every empty cell."""
+        return numpy.flatnonzero(self.flat == -1).tolist()
+
+    def occupiedCells(self):
+        """Yields (x, y, z, player) for every occupied cell."""
+        for x, y, z in numpy.argwhere(self.cells != -1).tolist():
+            yield x, y, z, int(self.cells[x, y, z])
+
+    def copy(self):
+        new = self.__class__.__new__(self.__class__)
+        new.x, new.y, new.z = self.x, self.y, self.z
+        new.cells = self.cells.copy()
+        new.flat = new.cells.reshape(-1)
+        return new
+
+
+backends = {"list": ListGrid, "numpy": NumpyGrid}
+
+
+def generateGrid(x, y, z, players=2, backend=None):
+    """Generates an empty x * y * z board. backend is "numpy" or "list", defaulting to numpy when it's installed."""
+    if backend is None:
+        backend = "list" if numpy is None else "numpy"
+    if backend not in backends:
+        raise ValueError("Unknown grid backend: " + str(backend))
+    if backend == "numpy" and numpy is None:
+        raise ImportError("The numpy grid backend requires numpy to be installed")
+    return backends[backend](x, y, z, players)
@@ -0,0 +1,195 @@
+from vector import Vector3d, Position3d
+from board import generateGrid
+from lines import createLineDetector
+
+
+class Player:
+
+    def __init__(self, colour=(0, 0, 0), name=""):
+        self.colour = colour
+        self.name = name
+
+
+class Engine:
+    """The rules of a match, with no rendering or input handling. Importing this module doesn't import pygame, so
+    it can be used for simulations and servers without a display."""
+
+    def __init__(self, x=3, y=3, z=3, players=2, wrapping=False, win_length=3, backend=None):
+        if isinstance(players, int):
+            players = [Player() for i in range(players)]
+        self.winningLine = None
+        self.winningDirection = None
+        self.players = players
+        self.currentTurn = 0
+        self.x = x
+        self.y = y
+        self.z = z
+        self.wrapping = wrapping
+        self.grid = generateGrid(x, y, z, max(len(players), 2), backend)
+        self.win_length = win_length
+        self.lines = createLineDetector(self.grid, win_length, wrapping, max(len(players), 2))
+        self.winner = -1
+        self.moveCount = 0
+        # cells played through playCell, in order, for saving and replaying the match
+        self.moves = []
+        # (cell, player) for every move taken back with undo, most recent last
+        self.undone = []
+
+    def checkForWrap(self, position):
+        """Checks whether position is in bounds. If in bounds or self.wrapping == true, returns the new position
+        (modified to be in-bounds if necessary). Otherwise, returns None."""
+        if position.x > self.x - 1:
+            if self.wrapping:
+                position.x = 0
+            else:
+                return None
+        elif position.x < 0:
+            if self.wrapping:
+                position.x = self.x - 1
+            else:
+                return None
+
+        if position.y > self.y - 1:
+            if self.wrapping:
+                position.y = 0
+            else:
+                return None
+        elif position.y < 0:
+            if self.wrapping:
+                position.y = self.y - 1
+            else:
+                return None
+
+        if position.z > self.z - 1:
+            if self.wrapping:
+                position.z = 0
+            else:
+                return None
+        elif position.z < 0:
+            if self.wrapping:
+                position.z = self.z - 1
+            else:
+                return None
+
+        return position
+
+    def checkForWin(self, point_to_check, player):
+        """Checks whether the latest change results in a line. Returns line_found, points_in_line, direction"""
+        cell = self.grid.index(point_to_check.x, point_to_check.y, point_to_check.z)
+        return self.lineResult(self.lines.findWin(cell, player))
+
+    def lineResult(self, line):
+        """Converts a line from self.lines into the line_found, points_in_line, direction format."""
+        if line is None:
+            return False, None, None
+        # plain vectors, as the views test for cells with Vector3d(x, y, z) in points
+        points = [Vector3d(x, y, z) for x, y, z in self.lines.coordinates(line)]
+        return True, points, Position3d(*self.lines.direction(line))
+
+    def makeMove(self, position, player):
+        """Attempts to put player's marker at position. If a valid move, will advance self.currentTurn and check for
+        victory. Returns whether the move was made."""
+        return self.playCell(self.grid.index(position.x, position.y, position.z), player)
+
+    def playCell(self, cell, player):
+        """As makeMove, but takes an index into self.grid.flat rather than a position."""
+        if self.winner != -1 or self.grid.flat[cell] != -1:
+            return False
+        # a new move replaces any moves that were undone
+        if self.undone:
+            self.undone = []
+        self.setCell(cell, player)
+        self.moves.append(cell)
+        self.nextTurn()
+        return True
+
+    def unplayCell(self):
+        """Takes back the last move made with playCell, returning its (cell, player). Doesn't depend on the size of
+        the board, so searches can make and unmake moves rather than copying the engine."""
+        cell = self.moves.pop()
+        player = int(self.grid.flat[cell])
+        self.grid.flat[cell] = -1
+        self.moveCount -= 1
+        self.lines.remove(cell, player)
+        # moves can't be made once somebody has won, so nobody had before this one
+        self.winner = -1
+        self.winningLine = None
+        self.winningDirection = None
+        self.currentTurn = (self.currentTurn - 1) % len(self.players)
+        return cell, player
+
+    def undo(self):
+        """Takes back the last move, so it can be made again with redo. Returns whether there was a move to undo."""
+        if not self.moves:
+            return False
+        self.undone.append(self.unplayCell())
+        return True
+
+    def redo(self):
+        """Makes the last move taken back with undo again. Returns whether there was a move to redo."""
+        if not self.undone:
+            return False
+        undone = self.undone
+        cell, player = undone.pop()
+        self.playCell(cell, player)
+        self.undone = undone
+        return True
+
+    def setCell(self, cell, player):
+        """Puts player's marker in an empty cell and checks for victory, without changing whose turn it is. Used
+        directly when setting up positions."""
+        self.grid.flat[cell] = player
+        self.moveCount += 1
+        # line counts are updated incrementally, so finding a win doesn't require searching the grid
+        game_won, self.winningLine, self.winningDirection = self.lineResult(self.lines.add(cell, player))
+        if game_won:
+            self.winner = player
+
+    def nextTurn(self):
+        self.currentTurn += 1
+        if self.currentTurn >= len(self.players):
+            self.currentTurn = 0
+
+    def changePoint(self, position, new):
+        """Converts Vector3D values to grid indices, saves on boilerplate code."""
+        self.grid[position.x, position.y, position.z] = new
+
+    def owners(self):
+        """Returns a list of the player in every cell, or -1 for empty cells, indexed like self.grid.flat."""
+        return [int(player) for player in self.grid.flat]
+
+    def legalCells(self):
+        """Returns a list of every empty cell, as indices into self.grid.flat."""
+        return self.grid.emptyCells()
+
+    def copy(self):
+        """Returns an independent copy of the match state. Players are shared with the original."""
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new.grid = self.grid.copy()
+        new.lines = self.lines.copy(new.grid)
+        new.moves = self.moves[:]
+        new.undone = self.undone[:]
+        return new
+
+    def isDraw(self):
+        """Returns whether every cell has been filled without anybody winning."""
+        return self.winner == -1 and self.moveCount == self.x * self.y * self.z
+
+    def getLayer(self, y):
+        """Returns a slice of the 3d grid at level y indexed as layer[x][z], or None if y is out of bounds.
+        With the numpy backend this is a view rather than a copy."""
+        if y < 0 or y >= self.y:
+            return None
+        return self.grid.getLayer(y)
+
+    def printGrid(self):
+        """Prints the grid in 2d slices from lowest y to highest. Used for debugging."""
+        for y in range(self.y):
+            layer = self.grid.getLayer(y)
+            for z in range(self.z):
+                for x in range(self.x):
+                    print(layer[x][z], end="")
+                print()
+            print()
+            print()
@@ -0,0 +1,218 @@
+import math
+
+# every direction a line can be drawn in, excluding their opposites
+directions = ((0, 0, 1), (0, 1, 0), (1, 0, 0),
+              (1, 0, 1), (0, 1, 1), (1, 1, 0), (1, 1, 1),
+              (-1, 0, 1), (0, -1, 1), (-1, 1, 0),
+              (1, 1, -1), (1, -1, 1), (-1, 1, 1))
+
+
+def cycleLength(size, direction):
+    """Returns how many steps in direction it takes to get back to the starting cell on a wrapping board."""
+    length = 1
+    for axis in range(3):
+        if direction[axis] != 0:
+            length = length * size[axis] // math.gcd(length, size[axis])
+    return length
+
+
+class LineIndex:
+    """Precomputed index from every cell to the winning lines passing through it, along with how many cells of each
+    line every player owns. Cells are flat indices, matching board.ListGrid and board.NumpyGrid."""
+
+    def __init__(self, x, y, z, length=3, wrapping=False, players=2):
+        self.size = (x, y, z)
+        self.length = length
+        self.wrapping = wrapping
+        # cells in each line, in order along its direction
+        self.lines = []
+        # index into directions for each line
+        self.lineDirections = []
+        self.cellLines = [[] for i in range(x * y * z)]
+        for d in range(len(directions)):
+            self.addLines(d)
+        self.counts = [[0] * len(self.lines) for i in range(players)]
+
+    def addLines(self, d):
+        """Adds every line in directions[d] to the index."""
+        x, y, z = self.size
+        dx, dy, dz = directions[d]
+        k = self.length
+        seen = None
+        if self.wrapping:
+            cycle = cycleLength(self.size, directions[d])
+            if cycle < k:
+                # line would overlap itself
+                return
+            if cycle == k:
+                # each line is found once per cell in it
+                seen = set()
+            xs, ys, zs = range(x), range(y), range(z)
+        else:
+            # only start where the line will stay in bounds
+            xs = range(max(0, -dx * (k - 1)), min(x, x - dx * (k - 1)))
+            ys = range(max(0, -dy * (k - 1)), min(y, y - dy * (k - 1)))
+            zs = range(max(0, -dz * (k - 1)), min(z, z - dz * (k - 1)))
+
+        for sx in xs:
+            for sy in ys:
+                for sz in zs:
+                    if self.wrapping:
+                        cells = tuple((((sx + dx * i) % x) * y + (sy + dy * i) % y) * z + (sz + dz * i) % z
+                                      for i in range(k))
+                        if seen is not None:
+                            key = frozenset(cells)
+                            if key in seen:
+                                continue
+                            seen.add(key)
+                    else:
+                        cells = tuple(((sx + dx * i) * y + sy + dy * i) * z + sz + dz * i for i in range(k))
+                    line = len(self.lines)
+                    self.lines.append(cells)
+                    self.lineDirections.append(d)
+                    for cell in cells:
+                        self.cellLines[cell].append(line)
+
+    def add(self, cell, player):
+        """Records player placing a marker at cell. Returns a line completed by the move, or None."""
+        counts = self.counts[player]
+        length = self.length
+        won = None
+        for line in self.cellLines[cell]:
+            counts[line] += 1
+            if counts[line] == length and won is None:
+                won = line
+        return won
+
+    def remove(self, cell, player):
+        """Records player's marker at cell being taken back."""
+        counts = self.counts[player]
+        for line in self.cellLines[cell]:
+            counts[line] -= 1
+
+    def findWin(self, cell, player):
+        """Returns a line through cell completed by player, or None."""
+        counts = self.counts[player]
+        for line in self.cellLines[cell]:
+            if counts[line] == self.length:
+                return line
+        return None
+
+    def empty(self, players=2):
+        """Returns an index with no markers placed for players, sharing the line tables with this index."""
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new.counts = [[0] * len(self.lines) for i in range(players)]
+        return new
+
+    def copy(self, grid=None):
+        """Returns a copy with its own counts, sharing the line tables with this index."""
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new.counts = [counts[:] for counts in self.counts]
+        return new
+
+    def coordinates(self, line):
+        """Returns a list of (x, y, z) tuples for the cells in line."""
+        x, y, z = self.size
+        points = []
+        for cell in self.lines[line]:
+            cell, cz = divmod(cell, z)
+            cx, cy = divmod(cell, y)
+            points.append((cx, cy, cz))
+        return points
+
+    def direction(self, line):
+        return directions[self.lineDirections[line]]
+
+
+class LineScanner:
+    """Finds completed lines by counting matching cells outwards from the latest move, taking at most length - 1
+    steps each way in every direction. Used instead of LineIndex when the index would be too large to build."""
+
+    def __init__(self, grid, length=3, wrapping=False):
+        self.grid = grid
+        self.size = (grid.x, grid.y, grid.z)
+        self.length = length
+        self.wrapping = wrapping
+        self.cycles = [cycleLength(self.size, direction) for direction in directions]
+
+    def add(self, cell, player):
+        """Records player placing a marker at cell. Returns a line completed by the move, or None.
+        The grid must already contain the marker."""
+        return self.findWin(cell, player)
+
+    def remove(self, cell, player):
+        """Records player's marker at cell being taken back. Nothing is stored, so there's nothing to do."""
+        pass
+
+    def findWin(self, cell, player):
+        """Returns a line through cell completed by player, or None."""
+        x, y, z = self.size
+        flat = self.grid.flat
+        k = self.length
+        rest, cz = divmod(cell, z)
+        cx, cy = divmod(rest, y)
+        for d in range(len(directions)):
+            if self.wrapping and self.cycles[d] < k:
+                continue
+            dx, dy, dz = directions[d]
+            found = []
+            # the steps taken in both directions never exceed the line length, so no cell is counted twice
+            remaining = k - 1
+            for sign in (1, -1):
+                steps = 0
+                px, py, pz = cx, cy, cz
+                while steps < remaining:
+                    px, py, pz = px + dx * sign, py + dy * sign, pz + dz * sign
+                    if self.wrapping:
+                        px, py, pz = px % x, py % y, pz % z
+                    elif not (0 <= px < x and 0 <= py < y and 0 <= pz < z):
+                        break
+                    if flat[(px * y + py) * z + pz] != player:
+                        break
+                    steps += 1
+                remaining -= steps
+                found.append(steps)
+            if remaining == 0:
+                sx, sy, sz = cx - dx * found[1], cy - dy * found[1], cz - dz * found[1]
+                if self.wrapping:
+                    sx, sy, sz = sx % x, sy % y, sz % z
+                return sx, sy, sz, d
+        return None
+
+    def copy(self, grid):
+        """Returns a scanner reading from grid, which should be a copy of the grid this scanner reads."""
+        return self.__class__(grid, self.length, self.wrapping)
+
+    def coordinates(self, line):
+        """Returns a list of (x, y, z) tuples for the cells in line."""
+        x, y, z = self.size
+        sx, sy, sz, d = line
+        dx, dy, dz = directions[d]
+        points = [(sx + dx * i, sy + dy * i, sz + dz * i) for i in range(self.length)]
+        if self.wrapping:
+            points = [(px % x, py % y, pz % z) for px, py, pz in points]
+        return points
+
+    def direction(self, line):
+        return directions[line[3]]
+
+
+# largest number of (cell, line) pairs LineIndex will build before LineScanner is used instead
+indexLimit = 2000000
+# the last LineIndex built and its (x, y, z, length, wrapping), so new indices with the same settings share its line
+# tables. The menu creates a match for every change to the settings, and most of them don't change the lines. Only one
+# is kept, as indices for large boards take a lot of memory
+lastIndex = (None, None)
+
+
+def createLineDetector(grid, length=3, wrapping=False, players=2):
+    """Returns a LineIndex for grid, or a LineScanner if the index would be too large for the board."""
+    global lastIndex
+    if len(directions) * grid.x * grid.y * grid.z * length > indexLimit:
+        return LineScanner(grid, length, wrapping)
+    key = (grid.x, grid.y, grid.z, length, wrapping)
+    if lastIndex[0] != key:
+        lastIndex = (key, LineIndex(grid.x, grid.y, grid.z, length, wrapping, 0))
+    return lastIndex[1].empty(players)
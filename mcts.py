@@ -0,0 +1,236 @@
+import math
+import multiprocessing
+import random
+import time
+
+from engine import Engine
+from bitboard import BitboardEngine, maxCells
+from ai import ComputerPlayer, nearbyCells
+
+# empty engines to copy when restoring positions, keyed on board settings. Each worker process has its own.
+templates = {}
+
+
+def createState(settings):
+    """Returns an empty engine for settings, which are (x, y, z, players, wrapping, win_length)."""
+    if settings not in templates:
+        x, y, z, players, wrapping, win_length = settings
+        if x * y * z <= maxCells:
+            templates[settings] = BitboardEngine(x, y, z, players, wrapping, win_length)
+        else:
+            templates[settings] = Engine(x, y, z, players, wrapping, win_length)
+    return templates[settings].copy()
+
+
+def restoreState(settings, owners, turn):
+    """Returns an engine where owners[cell] is the player in each cell, or -1, and it's turn's move."""
+    state = createState(settings)
+    for cell in range(len(owners)):
+        if owners[cell] != -1:
+            state.setCell(cell, owners[cell])
+    state.currentTurn = turn
+    return state
+
+
+def addReward(totals, winner):
+    """Adds the max-n reward vector for a finished game to totals. A draw is shared equally."""
+    if winner >= 0:
+        totals[winner] += 1
+    else:
+        for player in range(len(totals)):
+            totals[player] += 1 / len(totals)
+
+
+def rollout(task):
+    """Plays count random games from a position, returning the total reward for each player.
+    Runs in worker processes, so only takes picklable arguments."""
+    settings, owners, turn, moves, count, max_moves, seed = task
+    rng = random.Random(seed)
+    base = restoreState(settings, owners, turn)
+    for cell in moves:
+        base.playCell(cell, base.currentTurn)
+    totals = [0.0] * settings[3]
+    for i in range(count):
+        state = base.copy()
+        cells = state.legalCells()
+        rng.shuffle(cells)
+        for cell in cells[:max_moves]:
+            if state.winner != -1:
+                break
+            state.playCell(cell, state.currentTurn)
+        addReward(totals, state.winner)
+    return totals
+
+
+class Node:
+
+    def __init__(self, move, mover, parent, untried):
+        self.move = move
+        # the player who made move
+        self.mover = mover
+        self.parent = parent
+        self.children = {}
+        self.untried = untried
+        self.visits = 0
+        self.rewards = None
+
+    def value(self):
+        """Returns the average reward for the player who moved into this node."""
+        if self.rewards is None or self.visits == 0:
+            return 0
+        return self.rewards[self.mover] / self.visits
+
+
+class MCTSPlayer(ComputerPlayer):
+    """Chooses moves with Monte Carlo Tree Search. Every node keeps a reward for each player, and each player is
+    assumed to pick the move best for themself (max-n), so it works for any number of players.
+
+    Stops after iterations iterations or time_limit seconds, whichever is first. Random rollouts are run in a pool of
+    processes worker processes, defaulting to one per core, with rollouts rollouts for every new leaf.
+    The tree is kept between turns, continuing from the position after everybody else's moves."""
+
+    def __init__(self, colour=(0, 0, 0), name="Computer", time_limit=1.0, iterations=None, processes=None,
+                 rollouts=8, exploration=1.4, max_rollout_moves=None, seed=None):
+        super().__init__(colour, name)
+        self.time_limit = time_limit
+        self.iterations = iterations
+        self.processes = processes or multiprocessing.cpu_count()
+        self.rollouts = rollouts
+        self.exploration = exploration
+        self.max_rollout_moves = max_rollout_moves
+        self.random = random.Random(seed)
+        self.pool = None
+        self.root = None
+        self.rootOwners = None
+        self.rootTurn = 0
+        self.settings = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def report(self):
+        if not self.lastSearch:
+            return ""
+        return str(int(self.lastSearch["rps"])) + " rollouts/s"
+
+    def candidateMoves(self, state):
+        if state.winner != -1:
+            return []
+        if isinstance(state, BitboardEngine):
+            return state.legalCells()
+        return nearbyCells(state)
+
+    def reuseTree(self, owners, turn):
+        """Returns the node for the position in owners, following the moves made since the last search, or None."""
+        node = self.root
+        tracked = self.rootOwners[:]
+        current = self.rootTurn
+        while node is not None and tracked != owners:
+            # every player places exactly one marker a turn, so the new moves can be replayed in order
+            placed = [cell for cell in range(len(owners)) if owners[cell] == current and tracked[cell] == -1]
+            if len(placed) != 1:
+                return None
+            node = node.children.get(placed[0])
+            tracked[placed[0]] = current
+            current = (current + 1) % self.settings[3]
+        if node is None or current != turn:
+            return None
+        return node
+
+    def chooseMove(self, game):
+        start = time.perf_counter()
+        settings = (game.x, game.y, game.z, len(game.players), game.wrapping, game.win_length)
+        if game.x * game.y * game.z <= maxCells:
+            state = BitboardEngine.fromEngine(game)
+        else:
+            state = game.copy()
+        if not self.candidateMoves(state):
+            # the board is full or already won, so there's nothing to search
+            self.lastSearch = {}
+            return None
+        owners = state.owners()
+        root = None
+        if self.root is not None and settings == self.settings:
+            root = self.reuseTree(owners, state.currentTurn)
+        reused = 0
+        if root is None:
+            root = Node(None, -1, None, self.candidateMoves(state))
+        else:
+            root.parent = None
+            reused = root.visits
+        self.root, self.rootOwners, self.rootTurn, self.settings = root, owners, state.currentTurn, settings
+
+        if self.pool is None and self.processes > 1:
+            self.pool = multiprocessing.Pool(self.processes)
+        max_moves = self.max_rollout_moves or len(owners)
+        deadline = start + self.time_limit
+        iterations = 0
+        rollouts = 0
+        batch = self.processes * 2
+        while time.perf_counter() < deadline and (self.iterations is None or iterations < self.iterations):
+            leaves = []
+            tasks = []
+            for i in range(batch):
+                node, path, leaf_state = self.select(root, state)
+                if leaf_state.winner != -1 or leaf_state.isDraw():
+                    totals = [0.0] * len(game.players)
+                    addReward(totals, leaf_state.winner)
+                    self.backpropagate(node, totals)
+                else:
+                    leaves.append(node)
+                    tasks.append((settings, owners, state.currentTurn, path, self.rollouts, max_moves,
+                                  self.random.getrandbits(32)))
+                iterations += 1
+            if self.pool is not None:
+                results = self.pool.map(rollout, tasks)
+            else:
+                results = [rollout(task) for task in tasks]
+            for node, totals in zip(leaves, results):
+                self.backpropagate(node, [total / self.rollouts for total in totals])
+            rollouts += len(tasks) * self.rollouts
+
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        self.lastSearch = {"iterations": iterations, "rollouts": rollouts, "time": elapsed, "rps": rollouts / elapsed,
+                           "reused_visits": reused}
+        if not root.children:
+            return self.candidateMoves(state)[0]
+        return max(root.children.values(), key=lambda child: child.visits).move
+
+    def select(self, root, root_state):
+        """Walks down the tree with UCT, expanding one new node. Every node passed through is given a visit straight
+        away, which discourages the rest of a batch from picking the same path before its results are in.
+        Returns the node reached, the moves taken to reach it and the state there."""
+        node = root
+        state = root_state.copy()
+        path = []
+        node.visits += 1
+        while state.winner == -1 and not state.isDraw():
+            if node.untried:
+                cell = node.untried.pop(self.random.randrange(len(node.untried)))
+                mover = state.currentTurn
+                state.playCell(cell, mover)
+                child = Node(cell, mover, node, self.candidateMoves(state))
+                node.children[cell] = child
+                child.visits += 1
+                path.append(cell)
+                return child, path, state
+            if not node.children:
+                break
+            log_visits = math.log(node.visits)
+            node = max(node.children.values(), key=lambda child: child.value() + self.exploration * math.sqrt(
+                log_visits / child.visits))
+            state.playCell(node.move, state.currentTurn)
+            node.visits += 1
+            path.append(node.move)
+        return node, path, state
+
+    def backpropagate(self, node, rewards):
+        while node is not None:
+            if node.rewards is None:
+                node.rewards = rewards[:]
+            else:
+                for player in range(len(rewards)):
+                    node.rewards[player] += rewards[player]
+            node = node.parent
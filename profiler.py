@@ -0,0 +1,109 @@
+import csv
+import json
+import time
+from collections import deque
+
+
+class FrameProfiler:
+    """Times the phases of each frame and counts what was drawn, for an on-screen breakdown and for saving to a file.
+
+    Phases are timed with the phase context manager, or added with add when they're timed elsewhere, such as the
+    camera's. endFrame finishes the current frame's sample. The last history frames are kept for the overlay, and
+    every frame since record was called is kept for dump."""
+
+    # in the order they happen in a frame
+    phases = ("eventLoop", "scene", "pack", "project", "sort", "draw", "flip")
+    counts = ("objects", "points", "faces")
+
+    def __init__(self, history=60, refresh=0.5):
+        self.history = deque(maxlen=history)
+        self.refresh = refresh
+        self.current = {}
+        self.frameStart = time.perf_counter()
+        self.recording = None
+        self.lines = []
+        self.lastRefresh = 0
+
+    def phase(self, name):
+        """Returns a context manager which adds the time spent inside it to phase name of the current frame."""
+        return PhaseTimer(self, name)
+
+    def add(self, name, value):
+        self.current[name] = self.current.get(name, 0) + value
+
+    def endFrame(self, **counts):
+        """Finishes the current frame, storing its phase times and the given counts, and starts the next."""
+        now = time.perf_counter()
+        sample = {"frame": now - self.frameStart}
+        for name in self.phases:
+            sample[name] = self.current.get(name, 0)
+        for name in self.counts:
+            sample[name] = counts.get(name, 0)
+        self.history.append(sample)
+        if self.recording is not None:
+            sample["time"] = now
+            self.recording.append(sample)
+        self.current = {}
+        self.frameStart = now
+        return sample
+
+    def averages(self):
+        """Returns the mean of every value over the kept frames."""
+        if not self.history:
+            return {}
+        return {name: sum(sample[name] for sample in self.history) / len(self.history)
+                for name in self.history[-1] if name != "time"}
+
+    def record(self):
+        """Starts keeping every frame for dump."""
+        self.recording = []
+
+    def dump(self, path):
+        """Writes every frame since record was called to path, as JSON if it ends in .json and CSV otherwise. Times
+        are in seconds. Stops recording, and returns the number of frames written."""
+        samples, self.recording = self.recording or [], None
+        fields = ["time", "frame"] + list(self.phases) + list(self.counts)
+        with open(path, "w", newline="") as file:
+            if path.endswith(".json"):
+                json.dump({"fields": fields, "frames": [[sample[name] for name in fields] for sample in samples]},
+                          file)
+            else:
+                writer = csv.DictWriter(file, fields)
+                writer.writeheader()
+                writer.writerows(samples)
+        return len(samples)
+
+    def draw(self, screen, text, position=(0, 0)):
+        """Draws the average time of every phase and the counts to screen using text, a TextCache, and returns the
+        rect drawn to. The numbers are only updated every refresh seconds, so they can be read and are only rendered
+        when they change."""
+        now = time.perf_counter()
+        if now - self.lastRefresh >= self.refresh:
+            self.lastRefresh = now
+            averages = self.averages()
+            if averages:
+                self.lines = ["{:<9} {:6.2f} ms".format("total", averages["frame"] * 1000)]
+                self.lines += ["{:<9} {:6.2f} ms".format(name, averages[name] * 1000) for name in self.phases]
+                self.lines += ["{:<9} {:6.0f}".format(name, averages[name]) for name in self.counts]
+                if self.recording is not None:
+                    self.lines.append("recording " + str(len(self.recording)))
+        x, y = position
+        rect = None
+        for line in self.lines:
+            drawn = screen.blit(text.render(line, True, (255, 0, 0)), (x, y))
+            rect = drawn if rect is None else rect.union(drawn)
+            y += drawn.height
+        return rect
+
+
+class PhaseTimer:
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exception):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
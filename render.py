@@ -1,163 +1,36 @@
 import math
+import time
 import pygame
 import pygame.gfxdraw
-from shapely.geometry import Polygon
+from collections import OrderedDict
+from functools import lru_cache
+from vector import *
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-class Vector3d:
 
-    def __init__(self, x, y, z):
-        self.x = x
-        self.y = y
-        self.z = z
-
-    def clone(self):
-        return __class__(self.x, self.y, self.z)
-
-    def __add__(self, addition):
-        if isinstance(addition, int) or isinstance(addition, float):
-            return __class__(self.x + addition, self.y + addition, self.z + addition)
-        else:
-            return __class__(self.x + addition.x, self.y + addition.y, self.z + addition.z)
-
-    def __sub__(self, subtraction):
-        if isinstance(subtraction, int) or isinstance(subtraction, float):
-            return __class__(self.x - subtraction, self.y - subtraction, self.z - subtraction)
-        else:
-            return __class__(self.x - subtraction.x, self.y - subtraction.y, self.z - subtraction.z)
-
-    def __mul__(self, mult):
-        if isinstance(mult, int) or isinstance(mult, float):
-            return __class__(self.x * mult, self.y * mult, self.z * mult)
-        else:
-            return __class__(self.x * mult.x, self.y * mult.y, self.z * mult.z)
-
-    def __truediv__(self, mult):
-        if isinstance(mult, int) or isinstance(mult, float):
-            return __class__(self.x / mult, self.y / mult, self.z / mult)
-        else:
-            return __class__(self.x / mult.x, self.y / mult.y, self.z / mult.z)
-
-    def __eq__(self, other):
-        if not isinstance(other, self.__class__):
-            return False
-        elif self.x != other.x:
-            return False
-        elif self.y != other.y:
-            return False
-        elif self.z != other.z:
-            return False
-        else:
-            return True
-
-    def __str__(self):
-        return str(round(self.x * 1000) / 1000) + ", " + str(round(self.y * 1000) / 1000) + ", " + str(
-            round(self.z * 1000) / 1000)
-
-    def magnitude(self):
-        return math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
-
-    def dotProduct(self, vector):
-        x = self.x * vector.x
-        y = self.y * vector.y
-        z = self.z * vector.z
-        return x + y + z
-
-    def angleBetween(self, other):
-        # returns the angle in radians between two vectors using u.v = |u| * |v| * cos\theta
-        # guaranteed to be <=pi
-        denom = self.magnitude() * other.magnitude()
-        numer = self.dotProduct(other)
-        return math.acos(numer / denom)
-
-    def rotateX(self, theta, return_new=False):
-        # performs a rotation of theta radians along the x-axis
-        # applies the rotation to the current vector, unless return_new == True
-        y = self.y * math.cos(theta) - self.z * math.sin(theta)
-        z = self.z * math.cos(theta) + self.y * math.sin(theta)
-        if return_new:
-            return __class__(self.x, y, z)
-        else:
-            self.y, self.z = y, z
-
-    def rotateY(self, theta, return_new=False):
-        # performs a rotation of theta radians along the y-axis
-        # applies the rotation to the current vector, unless return_new == True
-        x = self.x * math.cos(theta) - self.z * math.sin(theta)
-        z = self.z * math.cos(theta) + self.x * math.sin(theta)
-        if return_new:
-            return __class__(x, self.y, z)
-        else:
-            self.x, self.z = x, z
-
-    def rotateZ(self, theta, return_new=False):
-        # performs a rotation of theta radians along the z-axis
-        # applies the rotation to the current vector, unless return_new == True
-        x = self.x * math.cos(theta) - self.y * math.sin(theta)
-        y = self.y * math.cos(theta) + self.x * math.sin(theta)
-        if return_new:
-            return __class__(x, y, self.z)
-        else:
-            self.x, self.y = x, y
-
-    def modifyAxes(self, rotation):
-        # applies a Euler angles rotation in the order X->Y->Z
-        self.rotateX(rotation.x)
-        self.rotateY(rotation.y)
-        self.rotateZ(rotation.z)
-        return self
-
-
-class Rotation3d(Vector3d):
-    # A vector storing a Euler angles rotation
-
-    def __init__(self, x, y, z, radians=False):
-        super().__init__(x, y, z)
-        if not radians:
-            self.update(x, y, z, False)
-
-    def update(self, x, y, z, radians=False):
-        # sets the vector's angles in degrees unless radians == True
-        if radians:
-            self.x = x
-            self.y = y
-            self.z = z
-        else:
-            self.x = math.radians(x)
-            self.y = math.radians(y)
-            self.z = math.radians(z)
-
-    def normalise(self):
-        # normalises all angles to be below 2pi
-        if self.x > 2 * math.pi:
-            self.x -= 2 * math.pi
-        elif self.x < 0:
-            self.x += 2 * math.pi
-        if self.y > 2 * math.pi:
-            self.y -= 2 * math.pi
-        elif self.y < 0:
-            self.y += 2 * math.pi
-        if self.z > 2 * math.pi:
-            self.z -= 2 * math.pi
-        elif self.z < 0:
-            self.z += 2 * math.pi
-
-
-class Position3d(Vector3d):
-
-    def getDistance(self, otherPosition):
-        return (self - otherPosition).magnitude()
+# ways of ordering faces in the numpy renderer. OBJECT_SORT draws the furthest objects first, as the per-object path
+# does, FACE_SORT sorts every face in the scene together, and DEPTH_BUFFER compares depths per pixel instead
+OBJECT_SORT, FACE_SORT, DEPTH_BUFFER = "objects", "faces", "depth buffer"
+sortModes = (OBJECT_SORT, FACE_SORT, DEPTH_BUFFER)
 
 
 class Camera:
     # a camera which always looks towards a set position
 
-    def __init__(self, position=None, orientation=Rotation3d(0, 0, 0), fov=90, width=10, height=10, zoom=20,
-                 target=Position3d(0, 0, 0)):
+    def __init__(self, position=None, orientation=None, fov=90, width=10, height=10, zoom=20, target=None):
         self.clock = pygame.time.Clock()
         self.position = None
         self.zoom_linearity = 1.3
 
+        # vectors are changed in place, so each camera needs its own rather than sharing default arguments
+        if orientation is None:
+            orientation = Rotation3d(0, 0, 0)
+        if target is None:
+            target = Position3d(0, 0, 0)
         self.target = target
         if position is None:
             self.orientation = orientation
@@ -177,9 +50,19 @@ class Camera:
         self.zoom_sensitivity = 1
         self.locked = False
         self.radius = 1.8 * fov / 90
-        self.xaxis = Position3d(1, 0, 0)
-        self.yaxis = Position3d(0, 1, 0)
-        self.zaxis = Position3d(0, 0, 1)
+        # project with numpy when it's installed, rather than point by point
+        self.vectorised = True
+        self.packed = None
+        self.packedStatic = None
+        # how the numpy renderer orders faces, one of sortModes. Ignored by the per-object path, which always sorts
+        # by object
+        self.sorting = OBJECT_SORT
+        self.scratch = None
+        # counts from the last call to render, for checking how much culling saves
+        self.lastFrame = {}
+        # seconds spent in each phase of the last call to render: packing, projecting, sorting and drawing. The
+        # per-object path projects as it draws, so its projection is counted in draw
+        self.frameTimes = {}
 
     def updateScreen(self, width, height):
         # updates the values used for rendering to a pygame screen
@@ -220,27 +103,205 @@ class Camera:
         self.apply_zoom_and_orientation()
 
     def apply_zoom_and_orientation(self):
-        self.position = self.target - Position3d(0, 0, self.zoom_linearity**(self.zoom)).modifyAxes(self.orientation)
-        self.xaxis = Position3d(1, 0, 0).modifyAxes(self.orientation)
-        self.yaxis = Position3d(0, 1, 0).modifyAxes(self.orientation)
-        self.zaxis = Position3d(0, 0, 1).modifyAxes(self.orientation)
-
-    def render(self, screen, items, width, height):
+        # the camera's axes are the columns of its rotation matrix, which is only recalculated when the orientation
+        # changes
+        m = rotationMatrix(self.orientation.x, self.orientation.y, self.orientation.z)
+        self.matrix = m
+        self.xaxis = Position3d(m[0], m[3], m[6])
+        self.yaxis = Position3d(m[1], m[4], m[7])
+        self.zaxis = Position3d(m[2], m[5], m[8])
+        distance = self.zoom_linearity**(self.zoom)
+        self.position = Position3d(self.target.x - m[2] * distance, self.target.y - m[5] * distance,
+                                   self.target.z - m[8] * distance)
+
+    def inView(self, position, radius):
+        # whether any of a sphere could be on screen. Each side of the view is a plane through the camera, and the
+        # sphere is outside if its centre is further than radius beyond any of them
+        relativePos = position - self.position
+        x, y, z = relativePos.dotProduct(self.xaxis), relativePos.dotProduct(self.yaxis), relativePos.dotProduct(
+            self.zaxis)
+        if z < -radius:
+            return False
+        # the edges of the screen are where x / z is half of hfov, and y / z half of vfov
+        across, up = self.hfov / 2, self.vfov / 2
+        horizontal = radius * math.sqrt(1 + across * across)
+        vertical = radius * math.sqrt(1 + up * up)
+        return abs(x) - across * z <= horizontal and abs(y) - up * z <= vertical
+
+    def render(self, screen, items, width, height, static=None, offset=None):
+        # static is an optional Layer drawn along with items. Moving the camera by offset is the same as moving every
+        # object by -offset, so objects can be built without knowing where they'll be drawn from
         self.updateScreen(width, height)
-        order = furthestFirst(items, origin - self.position)
-        for item in order:
-            item.render(screen, self.vfov, self.hfov, self.position, self.xaxis, self.yaxis, self.zaxis,
-                        self.orientation, width, height)
+        position = self.position
+        if offset is not None:
+            self.position = position + offset
+        try:
+            if self.vectorised and numpy is not None:
+                start = time.perf_counter()
+                packed = self.pack(items, static)
+                self.frameTimes = {"pack": time.perf_counter() - start}
+                self.renderPacked(screen, packed, width, height)
+                return
+            if static is not None:
+                items = items + static.objects
+            start = time.perf_counter()
+            visible = [item for item in items if self.inView(item.position, item.radius)]
+            order = furthestFirst(visible, origin - self.position)
+            sortedAt = time.perf_counter()
+            drawn = culled = points = 0
+            for item in order:
+                faces = item.render(screen, self.vfov, self.hfov, self.position, self.xaxis, self.yaxis, self.zaxis,
+                                    self.orientation, width, height)
+                drawn += faces[0]
+                culled += faces[1]
+                points += faces[2]
+            self.frameTimes = {"sort": sortedAt - start, "draw": time.perf_counter() - sortedAt}
+            self.lastFrame = {"objects": len(visible), "culled_objects": len(items) - len(visible), "points": points,
+                              "faces": drawn, "culled_faces": culled}
+        finally:
+            self.position = position
+
+    def pack(self, items, static=None):
+        # packing walks every point, so is only redone when given a different list of items or static layer
+        packed = self.packed
+        if packed is None or packed.items is not items or packed.count != len(items) or self.packedStatic is not static:
+            packed = PackedObjects(items)
+            if static is not None:
+                packed = PackedObjects.combine(packed, static.packed())
+            self.packed = packed
+            self.packedStatic = static
+        return packed
+
+    def renderPacked(self, screen, packed, width, height):
+        # projects every point in one go, then draws faces in the same order as the per-object path
+        self.lastFrame = {"objects": 0, "culled_objects": packed.objectCount, "points": 0, "faces": 0,
+                          "culled_faces": 0}
+        if not packed.faces:
+            return
+        start = time.perf_counter()
+        camera = numpy.array([self.position.x, self.position.y, self.position.z])
+        # multiplying by the rotation matrix dots every point with each of the camera's axes
+        matrix = numpy.reshape(self.matrix, (3, 3))
+
+        # objects whose bounding spheres are entirely outside the view are dropped before their points are projected
+        centres = (packed.objectPositions - camera) @ matrix
+        radii = packed.objectRadii
+        across, up = self.hfov / 2, self.vfov / 2
+        inView = (centres[:, 2] >= -radii) & \
+                 (numpy.abs(centres[:, 0]) - across * centres[:, 2] <= radii * math.sqrt(1 + across ** 2)) & \
+                 (numpy.abs(centres[:, 1]) - up * centres[:, 2] <= radii * math.sqrt(1 + up ** 2))
+        projected = numpy.flatnonzero(inView[packed.pointObjects])
+        view = numpy.ones((len(packed.points), 3))
+        view[projected] = (packed.points[projected] - camera) @ matrix
+        x, y, z = view[:, 0], view[:, 1], view[:, 2]
+        z[z == 0] = 1e-9
+        # clipped so points right next to the camera don't overflow when drawn
+        screenX = numpy.clip(numpy.floor((x / (z * self.hfov) + 1 / 2) * width), -1e7, 1e7)
+        screenY = numpy.clip(numpy.floor((1 - (y / (z * self.vfov) + 1 / 2)) * height), -1e7, 1e7)
+        behind = z < 0
+        screenX[behind] = -screenX[behind]
+        screenY[behind] = -screenY[behind]
+        # behind, left, right, above, below
+        offScreen = numpy.stack((behind, screenX < 0, screenX > width, screenY < 0, screenY > height), axis=1)
+        # skip faces whose points are all off-screen in the same direction
+        hidden = offScreen[packed.faceIndices].all(axis=1).any(axis=1)
+        # and faces of solid objects which point away from the camera. Faces without a normal have one of 0
+        backFaces = ((packed.points[packed.faceIndices[:, 0]] - camera) * packed.faceNormals).sum(axis=1) > 0
+        # and faces of objects which are drawn differently at this distance
+        objectDistances = numpy.linalg.norm(packed.objectPositions - camera, axis=1)
+        distances = objectDistances[packed.faceObjects]
+        used = inView[packed.faceObjects] & (distances >= packed.faceRanges[:, 0]) & \
+            (distances < packed.faceRanges[:, 1])
+        culled = used & backFaces
+        hidden |= ~used | culled
+        projectedAt = time.perf_counter()
+
+        faceDistances = numpy.linalg.norm(packed.faceCentres - camera, axis=1)
+        if self.sorting == OBJECT_SORT:
+            # furthest object first, then the furthest faces of each object
+            order = numpy.lexsort((-faceDistances, packed.faceObjects, -objectDistances[packed.faceObjects]))
+        else:
+            # one sort of every face in the scene, so faces of overlapping objects are interleaved properly
+            order = numpy.argsort(-faceDistances, kind="stable")
+        order = order[~hidden[order]]
+        sortedAt = time.perf_counter()
+        self.frameTimes["project"] = projectedAt - start
+        self.frameTimes["sort"] = sortedAt - projectedAt
+        visible = int(inView.sum())
+        self.lastFrame = {"objects": visible, "culled_objects": packed.objectCount - visible,
+                          "points": len(projected), "faces": len(order), "culled_faces": int(culled.sum())}
+
+        # faces are filled unless they have too many edges which are long on screen, matching Face.draw
+        coords = numpy.stack((screenX, screenY), axis=1)
+        corners = coords[packed.faceIndices]
+        lengths = ((corners[:, 1:] - corners[:, :-1]) ** 2).sum(axis=2)
+        cutoff = min(width, height) ** 2 / 2
+        longLines = numpy.where(lengths > cutoff, lengths // cutoff, 0).sum(axis=1)
+        fill = longLines <= packed.faceSizes
+
+        if self.sorting == DEPTH_BUFFER:
+            # the depth buffer needs every point in front of the camera, so faces which cross it are left out
+            order = order[(z[packed.faceIndices] > 0).all(axis=1)[order]]
+            self.renderDepthBuffered(screen, packed, order, coords, 1 / z, objectDistances, fill)
+            self.lastFrame["faces"] = len(order)
+            self.frameTimes["draw"] = time.perf_counter() - sortedAt
+            return
+
+        faces = packed.faces
+        for face, points, size, distance, filled in zip(*drawnFaces(packed, order, coords, objectDistances, fill)):
+            faces[face].draw(screen, points[:size], distance, filled)
+        self.frameTimes["draw"] = time.perf_counter() - sortedAt
+
+    def renderDepthBuffered(self, screen, packed, order, coords, inverseDepth, objectDistances, fill):
+        # draws each face on its own to a transparent scratch surface, then only copies the pixels which are closer
+        # than anything already drawn there. 1 / depth varies linearly across a face on screen, so it's fitted to each
+        # face's corners as a plane and compared per pixel, without needing faces to be sorted.
+        width, height = screen.get_size()
+        if self.scratch is None or self.scratch.get_size() != (width, height):
+            self.scratch = pygame.Surface((width, height), pygame.SRCALPHA)
+            self.scratch.fill((0, 0, 0, 0))
+        bounds = self.scratch.get_rect()
+        colours = pygame.surfarray.array3d(screen).astype(float)
+        nearest = numpy.zeros((width, height))
+
+        # least squares fit of inverse depth = a * x + b * y + c across the corners of each face
+        corners = coords[packed.faceIndices[order]]
+        system = numpy.concatenate((corners, numpy.ones(corners.shape[:2] + (1,))), axis=2)
+        planes = (numpy.linalg.pinv(system) @ inverseDepth[packed.faceIndices[order]][:, :, None])[:, :, 0].tolist()
+
+        faces = packed.faces
+        for face, points, size, distance, filled, (a, b, c) in zip(
+                *drawnFaces(packed, order, coords, objectDistances, fill), planes):
+            rect = faces[face].draw(self.scratch, points[:size], distance, filled).clip(bounds)
+            if rect.width and rect.height:
+                area = self.scratch.subsurface(rect)
+                alpha = pygame.surfarray.array_alpha(area) / 255
+                x, y = numpy.mgrid[rect.left:rect.right, rect.top:rect.bottom]
+                depth = a * x + b * y + c
+                region = nearest[rect.left:rect.right, rect.top:rect.bottom]
+                closer = (alpha > 0) & (depth > region)
+                if closer.any():
+                    region[closer] = depth[closer]
+                    # antialiased edges are blended with whatever they're in front of
+                    blend = alpha[closer][:, None]
+                    target = colours[rect.left:rect.right, rect.top:rect.bottom]
+                    target[closer] = target[closer] * (1 - blend) + pygame.surfarray.array3d(area)[closer] * blend
+                area.fill((0, 0, 0, 0))
+        pygame.surfarray.blit_array(screen, colours.astype(numpy.uint8))
 
 
 class Face:
 
-    def __init__(self, points, colour=(0, 200, 0)):
+    def __init__(self, points, colour=(0, 200, 0), normal=None):
         self.points = points
         # self.generateTriangles()
         self.position = Position3d(0, 0, 0)
         self.getPos()
         self.colour = colour
+        # the outward direction of a face which is only visible from one side, before its object is rotated.
+        # Faces without one are always drawn
+        self.origNormal = normal
+        self.normal = normal
 
     def __str__(self):
         toReturn = ""
@@ -249,43 +310,59 @@ class Face:
         return toReturn[:-2]
 
     def getPos(self):
+        # worked out from scratch each time, as the points move when their object is rotated
+        position = Position3d(0, 0, 0)
         for item in self.points:
-            self.position += item.position
-        self.position /= len(self.points)
+            position += item.position
+        position /= len(self.points)
+        self.position = position
 
     # def generateTriangles(self):
     #     self.triangles = []
     #     for i in range(1, len(self.points) - 1, 1):
     #         self.triangles.append((self.points[0], self.points[i], self.points[i + 1]))
 
-    def draw(self, screen, relativePos):
-        coords = [(point.lastRenderX, point.lastRenderY) for point in self.points]
-        length_cutoff = min(screen.get_width(), screen.get_height()) ** 2 / 2
-        line_cutoff = len(self.points)
-        long_lines = 0
-
-        for i in range(len(coords)-1):
-            x = coords[i+1][0] - coords[i][0]
-            y = coords[i+1][1] - coords[i][1]
-            length = x**2 + y**2
-            if length > length_cutoff:
-                long_lines += length // length_cutoff
-                if long_lines > line_cutoff:
-                    break
-        if long_lines <= line_cutoff:
-            pygame.draw.polygon(screen, self.colour, coords, 0)
+    def draw(self, screen, coords, distance, fill=None):
+        # coords are the projected points, distance is how far the face's object is from the camera and fill is
+        # whether to fill the face, worked out from the coords if not given
+        if fill is None:
+            length_cutoff = min(screen.get_width(), screen.get_height()) ** 2 / 2
+            line_cutoff = len(self.points)
+            long_lines = 0
+
+            for i in range(len(coords)-1):
+                x = coords[i+1][0] - coords[i][0]
+                y = coords[i+1][1] - coords[i][1]
+                length = x**2 + y**2
+                if length > length_cutoff:
+                    long_lines += length // length_cutoff
+                    if long_lines > line_cutoff:
+                        break
+            fill = long_lines <= line_cutoff
+        # returns the area drawn to
+        if fill:
+            return pygame.draw.polygon(screen, self.colour, coords, 0)
         else:
-            pygame.draw.polygon(screen, self.colour, coords, 5)
+            return pygame.draw.polygon(screen, self.colour, coords, 5)
+
+    def facingAway(self, relativePos):
+        # whether the face points away from a camera at -relativePos from its object
+        if self.normal is None:
+            return False
+        return self.normal.dotProduct(self.points[0].position + relativePos) > 0
 
     def render(self, screen, relativePos):
+        # returns whether the face was drawn
         for i in range(0, 5):
             count = len(list(filter(lambda x: not x.offScreen[i], self.points)))
             if count == 0:
                 # ensure that not all of the points are off-screen in the same direction
                 # (i.e. the object is off-screen)
-                return
+                return False
 
-        self.draw(screen, relativePos)
+        coords = [(point.lastRenderX, point.lastRenderY) for point in self.points]
+        self.draw(screen, coords, relativePos.magnitude())
+        return True
 
 
 class WireframeFace(Face):
@@ -295,14 +372,15 @@ class WireframeFace(Face):
         self.width = width
         self.min_width = min_width
 
-    def draw(self, screen: pygame.Surface, relativePos):
-        coords = [(point.lastRenderX, point.lastRenderY) for point in self.points]
-        width = int(max(self.width / relativePos.magnitude(), self.min_width))
-        pygame.draw.polygon(screen, self.colour, coords, width)
+    def draw(self, screen: pygame.Surface, coords, distance, fill=None):
+        width = int(max(self.width / distance, self.min_width))
+        rect = pygame.draw.polygon(screen, self.colour, coords, width)
         pygame.gfxdraw.aapolygon(screen, coords, self.colour)
+        return rect
 
     @classmethod
     def from_face(cls, face, width=5, min_width=1):
+        # the far side of a wireframe can be seen through it, so it never has a normal
         return WireframeFace(face.points, face.colour, width, min_width)
 
 
@@ -312,13 +390,9 @@ class Point:
         self.origPos = Position3d(x, y, z)
         self.position = Position3d(x, y, z)
         self.colour = colour
-        self.colours = []
         self.lastRenderX = 0
         self.lastRenderY = 0
         self.offScreen = [False, False, False, False, False]
-        self.radius = 1
-        self.canvas = pygame.Surface((self.radius * 2 + 1, self.radius * 2 + 1))
-        pygame.draw.circle(self.canvas, self.colour, (self.radius, self.radius), self.radius)
 
     def __str__(self):
         return str(self.position)
@@ -374,25 +448,41 @@ class Object3d:
         self.rotate(rotation, True)
 
     def rotate(self, rotation, absolute=False):
-        for item in self.points:
-            item.position = item.origPos * 1
         if absolute:
             self.rotation = rotation
         else:
-            self.rotation += rotation
+            # not in place, as the rotation may be shared with other objects
+            self.rotation = self.rotation + rotation
+        # one matrix for every point, rather than rotating each point around each axis in turn
+        matrix = rotationMatrix(self.rotation.x, self.rotation.y, self.rotation.z)
         for item in self.points:
-            item.position.modifyAxes(self.rotation)
+            item.position = item.origPos.clone().transform(matrix)
         for item in self.faces:
             item.getPos()
+            if item.origNormal is not None:
+                item.normal = item.origNormal.clone().transform(matrix)
+        # radius of a sphere around self.position containing every point, used to skip objects which are off-screen
+        self.radius = max([item.position.magnitude() for item in self.points] or [0])
 
     def render(self, screen, vfov, hfov, camera_pos, xaxis, yaxis, zaxis, cameraRotation, width, height):
+        # returns the number of faces drawn, the number skipped for facing away from the camera and the number of
+        # points projected
         relativePos = self.position - camera_pos
         posList = []
         for item in self.points:
             posList.append(item.render(screen, vfov, hfov, relativePos, xaxis, yaxis, zaxis, width, height))
-        order = furthestFirst(self.faces, relativePos)
+        faces = [item for item in self.faces if not item.facingAway(relativePos)]
+        order = furthestFirst(faces, relativePos)
+        drawn = 0
         for item in order:
-            item.render(screen, relativePos)
+            if item.render(screen, relativePos):
+                drawn += 1
+        return drawn, len(self.faces) - len(faces), len(self.points)
+
+    def parts(self):
+        # returns (near, far, object) for every object drawn in place of this one, each used while the camera is at
+        # least near and less than far from it
+        return [(0, math.inf, self)]
 
     def sortClockwise(self, points, fx, fy):
         if len(points) < 2:
@@ -419,15 +509,17 @@ class Object3d:
 
     def mergeLists(self, list1, list2, fx, fy):
         endList = []
-        while len(list1) > 0 and len(list2) > 0:  # while items in both lists
-            if self.compareClockwise(list1[0], list2[0], fx, fy):  # which has smallest item?
-                endList.append(list2.pop(0))
-            else:  # remove 1st item of smaller and add to newlist
-                endList.append(list1.pop(0))
-        if len(list1) > 0:  # if list1 still has items
-            endList.extend(list1)
-        else:  # add all items(already sorted)
-            endList.extend(list2)
+        i = j = 0
+        while i < len(list1) and j < len(list2):  # while items in both lists
+            if self.compareClockwise(list1[i], list2[j], fx, fy):  # which has smallest item?
+                endList.append(list2[j])
+                j += 1
+            else:  # take 1st remaining item of smaller and add to newlist
+                endList.append(list1[i])
+                i += 1
+        # add whatever's left of either list (already sorted)
+        endList.extend(list1[i:])
+        endList.extend(list2[j:])
         return endList
 
     def setup(self):
@@ -460,17 +552,84 @@ class Line(Object3d):
 
 
 class Cuboid(Object3d):
+    # the points and faces come from a CuboidMesh shared by every cuboid with the same size, outline and rotation, so
+    # each cuboid only holds its position, rotation and colours
 
     def __init__(self, position, size, rotation, colour=(0, 200, 0), outline_width=0, outline_colour=(0, 0, 0),
                  static=True):
         self.connections = []
         self.outline_width = outline_width
         self.outline_colour = outline_colour
+        self.mesh = None
         super().__init__(position, size, rotation, colour, static)
 
+    def rotate(self, rotation, absolute=False):
+        # the mesh's points can't be moved, so use the mesh for the new rotation instead
+        if not absolute:
+            rotation = self.rotation + rotation
+        self.rotation = rotation
+        self.mesh = cuboidMesh((self.size.x, self.size.y, self.size.z), (rotation.x, rotation.y, rotation.z),
+                               self.outline_width)
+        self.points = self.mesh.points
+        self.faces = self.skin()
+        self.radius = self.mesh.radius
+
+    def skin(self):
+        return self.mesh.skin(self.colour, self.outline_colour)
+
+
+class WireframeCuboid(Cuboid):
+
+    def __init__(self, position, size, rotation, colour=(0, 200, 0), outline_width=5, min_width=1, static=True):
+        self.wireframe = (outline_width, min_width)
+        super().__init__(position, size, rotation, colour, outline_width=0, static=static)
+        self.min_width = min_width
+
+    def skin(self):
+        return self.mesh.skin(self.colour, self.outline_colour, self.wireframe)
+
+
+class DistanceDetail:
+    # stands in for different objects depending on how far it is from the camera, so distant objects can be drawn
+    # with fewer faces. levels is a list of (distance, objects) in increasing order of distance, with each list of
+    # objects drawn from its distance up to the next. Every object should be at the same position.
+
+    def __init__(self, levels):
+        self.levels = levels
+        self.position = levels[0][1][0].position
+        self.radius = max(item.radius for distance, objects in levels for item in objects)
+
+    def parts(self):
+        parts = []
+        for i, (distance, objects) in enumerate(self.levels):
+            far = self.levels[i + 1][0] if i + 1 < len(self.levels) else math.inf
+            parts.extend((distance, far, item) for item in objects)
+        return parts
+
+    def render(self, screen, vfov, hfov, camera_pos, xaxis, yaxis, zaxis, cameraRotation, width, height):
+        distance = (self.position - camera_pos).magnitude()
+        drawn = culled = points = 0
+        for near, far, item in self.parts():
+            if near <= distance < far:
+                faces = item.render(screen, vfov, hfov, camera_pos, xaxis, yaxis, zaxis, cameraRotation, width, height)
+                drawn += faces[0]
+                culled += faces[1]
+                points += faces[2]
+        return drawn, culled, points
+
+
+class CuboidMesh(Object3d):
+    # the points and faces of a cuboid centred on the origin, with an outline of cuboids along its edges if
+    # outline_width > 0. Faces are given colours by skin, so one mesh can be used by cuboids of any colour.
+    # offset is only used when building outlines
+
+    def __init__(self, size, rotation, outline_width=0, offset=None):
+        self.outline_width = outline_width
+        self.offset = offset
+        self.skins = {}
+        super().__init__(Position3d(0, 0, 0), size, rotation)
+
     def setup(self):
-        self.points = []
-        self.faces = []
         size = self.size
         values = ((size.x / 2, size.y / 2, size.z / 2),
                   (-size.x / 2, size.y / 2, size.z / 2),
@@ -487,7 +646,8 @@ class Cuboid(Object3d):
                     points.append(item)
             # points.sort(key=lambda x: math.acos(x.position.y/math.sqrt(x.position.y**2+x.position.z**2)))
             points = self.sortClockwise(points, lambda x: x.position.y, lambda x: x.position.z)
-            self.faces.append(Face(points, self.colour))
+            # cuboids are solid, so each face can only be seen from outside
+            self.faces.append(Face(points, self.colour, Vector3d(math.copysign(1, values[0]), 0, 0)))
             values[0] = -values[0]
         del values[0]
         for i in range(2):
@@ -499,7 +659,7 @@ class Cuboid(Object3d):
             points = self.sortClockwise(points, lambda x: x.position.x, lambda x: x.position.z)
             # for item in points:
             #    print(item, math.sqrt(item.position.x**2+item.position.z**2) / item.position.z)
-            self.faces.append(Face(points, self.colour))
+            self.faces.append(Face(points, self.colour, Vector3d(0, math.copysign(1, values[0]), 0)))
             values[0] = -values[0]
         del values[0]
         for i in range(2):
@@ -509,7 +669,7 @@ class Cuboid(Object3d):
                     points.append(item)
             # points.sort(key=lambda x: math.acos(x.position.y/math.sqrt(x.position.x**2+x.position.y**2)))
             points = self.sortClockwise(points, lambda x: x.position.x, lambda x: x.position.y)
-            self.faces.append(Face(points, self.colour))
+            self.faces.append(Face(points, self.colour, Vector3d(0, 0, math.copysign(1, values[0]))))
             values[0] = -values[0]
 
         if self.outline_width > 0:
@@ -530,23 +690,240 @@ class Cuboid(Object3d):
                     direction /= -1
                 size = direction + self.outline_width
                 # print(p1, p2, mid, position, size, sep=" | ")
-                outlines.append(Cuboid(position, size, Rotation3d(0, 0, 0), self.outline_colour, outline_width=0))
+                # a new mesh rather than a shared one, as its points are moved
+                outlines.append(CuboidMesh(size, Rotation3d(0, 0, 0), 0, position))
             for outline in outlines:
                 for point in outline.points:
-                    point.origPos += outline.position
+                    point.origPos += outline.offset
                     self.points.append(point)
                 for face in outline.faces:
                     self.faces.append(face)
 
+    def skin(self, colour, outline_colour, wireframe=None):
+        # returns faces on the mesh's points, with the cuboid's own faces first in colour and then the outline's in
+        # outline_colour. wireframe is (width, min_width) to get WireframeFaces instead
+        key = (tuple(colour), tuple(outline_colour), wireframe)
+        faces = self.skins.get(key)
+        if faces is None:
+            faces = []
+            for i, face in enumerate(self.faces):
+                faceColour = colour if i < 6 else outline_colour
+                if wireframe is None:
+                    faces.append(Face(face.points, faceColour, face.normal))
+                else:
+                    faces.append(WireframeFace(face.points, faceColour, *wireframe))
+            self.skins[key] = faces
+        return faces
+
+
+@lru_cache(maxsize=256)
+def cuboidMesh(size, rotation, outline_width):
+    # returns the shared mesh for cuboids of size and rotation, both given as (x, y, z) tuples
+    return CuboidMesh(Vector3d(*size), Rotation3d(*rotation, radians=True), outline_width)
+
+
+class PackedObjects:
+    # every point and face of a list of objects packed into numpy arrays, so that they can be projected together.
+    # Objects are assumed not to move or rotate once packed.
+
+    def __init__(self, items):
+        self.items = items
+        self.count = len(items)
+        points = []
+        pointObjects = []
+        objectPositions = []
+        objectRadii = []
+        self.faces = []
+        allFacePoints = []
+        faceObjects = []
+        faceCentres = []
+        faceNormals = []
+        # the range of distances from its object that each face is drawn at
+        faceRanges = []
+        for i, item in enumerate(items):
+            objectPositions.append((item.position.x, item.position.y, item.position.z))
+            objectRadii.append(item.radius)
+            for near, far, part in item.parts():
+                position = part.position
+                indices = {}
+                for point in part.points:
+                    indices[id(point)] = len(points)
+                    points.append((position.x + point.position.x, position.y + point.position.y,
+                                   position.z + point.position.z))
+                    pointObjects.append(i)
+                for face in part.faces:
+                    facePoints = []
+                    for point in face.points:
+                        if id(point) not in indices:
+                            indices[id(point)] = len(points)
+                            points.append((position.x + point.position.x, position.y + point.position.y,
+                                           position.z + point.position.z))
+                            pointObjects.append(i)
+                        facePoints.append(indices[id(point)])
+                    self.faces.append(face)
+                    allFacePoints.append(facePoints)
+                    faceObjects.append(i)
+                    faceCentres.append((position.x + face.position.x, position.y + face.position.y,
+                                        position.z + face.position.z))
+                    normal = face.normal
+                    faceNormals.append((0, 0, 0) if normal is None else (normal.x, normal.y, normal.z))
+                    faceRanges.append((near, far))
+        self.points = numpy.array(points, float).reshape(-1, 3)
+        self.pointObjects = numpy.array(pointObjects, int)
+        self.objectPositions = numpy.array(objectPositions, float).reshape(-1, 3)
+        self.objectRadii = numpy.array(objectRadii, float)
+        self.faceCentres = numpy.array(faceCentres, float).reshape(-1, 3)
+        self.faceNormals = numpy.array(faceNormals, float).reshape(-1, 3)
+        self.faceRanges = numpy.array(faceRanges, float).reshape(-1, 2)
+        self.objectCount = len(self.objectPositions)
+        self.faceObjects = numpy.array(faceObjects, int)
+        self.faceSizes = numpy.array([len(points) for points in allFacePoints], int)
+        # faces are padded to the same number of points by repeating their last point, which adds no edges
+        most = max([len(points) for points in allFacePoints] or [1])
+        self.faceIndices = numpy.array([points + points[-1:] * (most - len(points)) for points in allFacePoints],
+                                       int).reshape(-1, most)
 
-class WireframeCuboid(Cuboid):
-
-    def __init__(self, position, size, rotation, colour=(0, 200, 0), outline_width=5, min_width=1, static=True):
-        super().__init__(position, size, rotation, colour, outline_width=0, static=static)
-        self.outline_width = outline_width
-        self.min_width = min_width
-        for i in range(len(self.faces)):
-            self.faces[i] = WireframeFace.from_face(self.faces[i], outline_width, min_width)
+    @classmethod
+    def combine(cls, first, second):
+        # returns one set of arrays holding first's objects followed by second's, treated as a packing of first's
+        # items. Only joins arrays, so second can be a large layer which is packed once and combined every time
+        # first changes
+        new = cls.__new__(cls)
+        new.items = first.items
+        new.count = first.count
+        new.objectCount = first.objectCount + second.objectCount
+        new.faces = first.faces + second.faces
+        for name in ("points", "objectPositions", "objectRadii", "faceCentres", "faceNormals", "faceRanges",
+                     "faceSizes"):
+            setattr(new, name, numpy.concatenate((getattr(first, name), getattr(second, name))))
+        new.pointObjects = numpy.concatenate((first.pointObjects, second.pointObjects + first.objectCount))
+        new.faceObjects = numpy.concatenate((first.faceObjects, second.faceObjects + first.objectCount))
+        most = max(first.faceIndices.shape[1], second.faceIndices.shape[1])
+        new.faceIndices = numpy.concatenate((padFaces(first.faceIndices, most),
+                                             padFaces(second.faceIndices, most) + len(first.points)))
+        return new
+
+
+def padFaces(faceIndices, most):
+    # repeats the last point of every face until each has most points
+    return numpy.concatenate((faceIndices, numpy.repeat(faceIndices[:, -1:], most - faceIndices.shape[1], axis=1)),
+                             axis=1)
+
+
+def drawnFaces(packed, order, coords, objectDistances, fill):
+    # returns lists of what's needed to draw each face in order: its index, its padded points on screen, its number
+    # of points, its object's distance and whether it's filled. Only the faces being drawn are turned into lists
+    return (order.tolist(), coords[packed.faceIndices[order]].astype(int).tolist(), packed.faceSizes[order].tolist(),
+            objectDistances[packed.faceObjects[order]].tolist(), fill[order].tolist())
+
+
+class Layer:
+    # a list of objects which is built once and then drawn many times, such as the grid. Packed for the numpy
+    # renderer the first time it's needed.
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.packedObjects = None
+
+    def packed(self):
+        if self.packedObjects is None:
+            self.packedObjects = PackedObjects(self.objects)
+        return self.packedObjects
+
+
+class LayerCache:
+    # keeps the size most recently used layers, keyed on whatever they were built from
+
+    def __init__(self, size=8):
+        self.size = size
+        self.layers = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        # returns the layer for key, calling build() to make its objects if it isn't cached
+        layer = self.layers.get(key)
+        if layer is not None:
+            self.hits += 1
+            self.layers.move_to_end(key)
+            return layer
+        self.misses += 1
+        layer = Layer(build())
+        self.layers[key] = layer
+        if len(self.layers) > self.size:
+            self.layers.popitem(last=False)
+        return layer
+
+
+class SurfacePool:
+    # hands out surfaces to draw a frame on, reusing the one last given out for the same size and flags instead of
+    # allocating a new one every frame. The size most recently used sizes are kept, so resizing the window back and
+    # forth doesn't allocate either. A surface keeps whatever was last drawn to it and is shared by everything asking
+    # for the same size and flags, so only use it for something which is redrawn completely every frame.
+
+    def __init__(self, size=4):
+        self.size = size
+        self.surfaces = OrderedDict()
+        self.created = 0
+        self.reused = 0
+
+    def get(self, size, flags=0):
+        key = (int(size[0]), int(size[1]), flags)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.reused += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.created += 1
+        surface = pygame.Surface(key[:2], flags)
+        if self.size > 0:
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.size:
+                self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+class DetailController:
+    # chooses a level of detail from how long frames take. Frame times are smoothed with an exponential moving average,
+    # and the level only changes once the average has stayed above slow or below fast for hold seconds. The gap
+    # between slow and fast, and waiting another hold after each change, stop it flickering between levels.
+
+    def __init__(self, levels, slow=1 / 30, fast=1 / 70, smoothing=0.1, hold=0.5):
+        self.levels = levels
+        self.slow = slow
+        self.fast = fast
+        self.smoothing = smoothing
+        self.hold = hold
+        self.average = None
+        self.direction = 0
+        self.waited = 0
+
+    def update(self, level, frameTime):
+        # returns the level to use after a frame which took frameTime seconds at level. Higher levels have less detail
+        if frameTime <= 0:
+            return level
+        if self.average is None:
+            self.average = frameTime
+        else:
+            self.average += (frameTime - self.average) * self.smoothing
+        if self.average > self.slow and level < self.levels - 1:
+            direction = 1
+        elif self.average < self.fast and level > 0:
+            direction = -1
+        else:
+            direction = 0
+        if direction != self.direction:
+            self.direction = direction
+            self.waited = 0
+        elif direction:
+            self.waited += frameTime
+            if self.waited >= self.hold:
+                self.waited = 0
+                return level + direction
+        return level
 
 
 def furthestFirst(li, relativePos):
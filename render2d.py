@@ -0,0 +1,260 @@
+import math
+from collections import OrderedDict
+
+import pygame
+
+
+class SideBySideView:
+    """Draws a match as adjacent 2d slices of the grid, one per y level.
+
+    Drawing is retained between frames: the background and gridlines are cached for each window size and zoom, every
+    layer of the grid keeps its own surface of markers, and only the cells changed by a move, the cursor or a win are
+    drawn again. draw returns the rects it changed, so they can be passed to pygame.display.update."""
+
+    def __init__(self, match, backgrounds=4):
+        self.match = match
+        # (window size, board size, zoom, visible slots, colour) -> background surface, most recently used last
+        self.backgrounds = OrderedDict()
+        self.backgroundLimit = backgrounds
+        self.background = None
+        # y level -> surface with the markers of that layer, only valid for the current geometry
+        self.layers = {}
+        self.geometry = None
+        self.slots = None
+        self.surface = None
+        self.full = True
+        self.dirty = []
+        # the state of the match when it was last drawn, to work out which cells have changed
+        self.moves = []
+        self.cursor = None
+        self.winningCells = set()
+
+    def invalidate(self, rect=None):
+        """Makes the next draw redraw rect, or everything. Needed whenever something else draws to the surface."""
+        if rect is None:
+            self.full = True
+        else:
+            self.dirty.append(pygame.Rect(rect))
+
+    def layout(self, width, height):
+        """Works out the size of the grids and markers to fit match.zoom2d grids side by side in width x height."""
+        match = self.match
+        # calculates what the largest the grid can be to fit {match.zoom2d} in view side by side.
+        gridSize = min(width // match.zoom2d, height)
+        # calculates gap at edges with the calculated size
+        if gridSize == width // match.zoom2d:
+            offset = (0, (height - gridSize) // 2)
+        else:
+            offset = ((width - gridSize * match.zoom2d) // 2, 0)
+
+        # calculates what width the gridlines should be
+        self.lineWidth = max(2, gridSize // 80)
+
+        # calculates what size the markers should be
+        self.markerSize = min(gridSize // match.x, gridSize // match.z) - 2 * self.lineWidth
+        if match.x > match.z:
+            gridOffset = (0, self.markerSize * (match.x - match.z))
+        elif match.x < match.z:
+            gridOffset = (self.markerSize * (match.z - match.x), 0)
+        else:
+            gridOffset = (0, 0)
+
+        # top left corner of the grid in each slot, and the size of a grid
+        self.pitch = self.markerSize + self.lineWidth
+        gridBottom = gridSize - gridOffset[1] - self.markerSize - (2 * self.lineWidth) + offset[1]
+        top = gridBottom - (match.z - 1) * self.pitch
+        self.origins = [(gridOffset[0] + (gridSize + gridOffset[0]) * i + offset[0] + (2 * self.lineWidth), top)
+                        for i in range(match.zoom2d)]
+        self.gridSize = (self.pitch * match.x - self.lineWidth, self.pitch * match.z - self.lineWidth)
+
+    def visibleLayers(self):
+        """Returns the y level shown in each slot, or None for empty slots. Keeps the currently selected grid in the
+        middle unless that would result in empty space."""
+        match = self.match
+        min_range = match.currentlySelected.y - math.floor(match.zoom2d / 2)
+        max_range = match.currentlySelected.y + math.ceil(match.zoom2d / 2)
+        if not match.wrapping:
+            if min_range < 0:
+                max_range -= min_range
+                min_range = 0
+            elif max_range > match.y:
+                diff = match.y - max_range
+                min_range += diff
+                max_range += diff
+
+        slots = []
+        for i in range(min_range, max_range):
+            if match.wrapping:
+                i %= match.y
+            slots.append(i if 0 <= i < match.y else None)
+        return slots
+
+    def getBackground(self, width, height):
+        """Returns the background colour and gridlines for the current layout, drawing them if they aren't cached."""
+        match = self.match
+        key = (self.geometry, tuple(layer is not None for layer in self.slots), match.backgroundColour())
+        background = self.backgrounds.get(key)
+        if background is not None:
+            self.backgrounds.move_to_end(key)
+            return background
+        background = pygame.Surface((width, height))
+        background.fill(key[2])
+        for slot, layer in enumerate(self.slots):
+            if layer is None:
+                continue
+            left, top = self.origins[slot]
+            for x in range(1, match.x):
+                pygame.draw.rect(background, (0, 0, 0),
+                                 pygame.Rect(left + x * self.pitch - self.lineWidth, top, self.lineWidth,
+                                             self.gridSize[1]))
+            for z in range(1, match.z):
+                pygame.draw.rect(background, (0, 0, 0),
+                                 pygame.Rect(left, top + z * self.pitch - self.lineWidth, self.gridSize[0],
+                                             self.lineWidth))
+        self.backgrounds[key] = background
+        if len(self.backgrounds) > self.backgroundLimit:
+            self.backgrounds.popitem(last=False)
+        return background
+
+    def getLayer(self, y):
+        """Returns the surface holding the markers of layer y, drawing all of them if it isn't cached."""
+        layer = self.layers.get(y)
+        if layer is None:
+            layer = pygame.Surface(self.gridSize, pygame.SRCALPHA)
+            layer.fill((0, 0, 0, 0))
+            match = self.match
+            for x in range(match.x):
+                for z in range(match.z):
+                    self.drawCell(layer, x, y, z)
+            self.layers[y] = layer
+        return layer
+
+    def cellRect(self, x, z):
+        """Returns the rect of cell (x, z) within its layer's surface."""
+        return pygame.Rect(x * self.pitch, (self.match.z - 1 - z) * self.pitch, self.markerSize, self.markerSize)
+
+    def drawCell(self, layer, x, y, z):
+        """Draws cell (x, y, z) to its layer's surface as it currently is."""
+        match = self.match
+        rect = self.cellRect(x, z)
+        layer.fill((0, 0, 0, 0), rect)
+        player = match.grid[x, y, z]
+        selected = match.draw_selected and (x, y, z) == (match.currentlySelected.x, match.currentlySelected.y,
+                                                        match.currentlySelected.z)
+        inset = self.lineWidth * 4
+        left, top, markerSize = rect.left, rect.top, self.markerSize
+        # if someone has played at (x, z), draw a square
+        if player != -1:
+            colour = match.players[player].colour
+            # if (x, z) is the currently selected space, draw a border to indicate
+            if selected:
+                pygame.draw.rect(layer, match.players[match.currentTurn].colour, rect)
+                pygame.draw.rect(layer, colour, pygame.Rect(left + inset, top + inset, markerSize - inset * 2,
+                                                            markerSize - inset * 2))
+            else:
+                pygame.draw.rect(layer, colour, rect)
+                # draw black square inside if part of winning line
+                if match.grid.index(x, y, z) in self.winningCells:
+                    pygame.draw.rect(layer, (0, 0, 0), pygame.Rect(left + markerSize // 4, top + markerSize // 4,
+                                                                   markerSize // 2, markerSize // 2))
+        # if square hasn't been played at but is selected, draw border
+        elif selected:
+            pygame.draw.rect(layer, match.players[match.currentTurn].colour, rect)
+            pygame.draw.rect(layer, (255, 255, 255), pygame.Rect(left + inset, top + inset, markerSize - inset * 2,
+                                                                 markerSize - inset * 2))
+
+    def changedCells(self):
+        """Returns the indices of every cell which may look different since the last call."""
+        match = self.match
+        changed = set()
+
+        # moves can be made, undone and redone, so the moves since the lists last agreed have all changed
+        moves = match.moves
+        if moves != self.moves:
+            common = min(len(moves), len(self.moves))
+            if moves[:common] != self.moves[:common]:
+                common = 0
+                while moves[common] == self.moves[common]:
+                    common += 1
+            changed.update(moves[common:])
+            changed.update(self.moves[common:])
+            self.moves = moves[:]
+
+        selected = match.currentlySelected
+        cursor = None
+        if 0 <= selected.x < match.x and 0 <= selected.y < match.y and 0 <= selected.z < match.z:
+            # the cursor is drawn in the current player's colour, so it changes every turn too
+            cursor = (match.grid.index(selected.x, selected.y, selected.z), match.draw_selected, match.currentTurn)
+        if cursor != self.cursor:
+            for state in (cursor, self.cursor):
+                if state is not None:
+                    changed.add(state[0])
+            self.cursor = cursor
+
+        winningCells = set()
+        if match.winner > -1 and match.winningLine:
+            winningCells = {match.grid.index(point.x, point.y, point.z) for point in match.winningLine}
+        if winningCells != self.winningCells:
+            changed.update(winningCells ^ self.winningCells)
+            self.winningCells = winningCells
+        return changed
+
+    def compose(self, surface, rect):
+        """Redraws rect of surface from the background and layer surfaces."""
+        surface.blit(self.background, rect.topleft, rect)
+        for slot, layer in enumerate(self.slots):
+            if layer is None:
+                continue
+            left, top = self.origins[slot]
+            area = pygame.Rect(left, top, *self.gridSize).clip(rect)
+            if area.width and area.height:
+                surface.blit(self.getLayer(layer), area.topleft, area.move(-left, -top))
+
+    def draw(self, surface):
+        """Brings surface up to date with the match, assuming nothing else has drawn to it since the last call unless
+        invalidate was called. Returns a list of the rects which were changed."""
+        match = self.match
+        width, height = surface.get_size()
+        geometry = (width, height, match.x, match.y, match.z, match.zoom2d)
+        if geometry != self.geometry:
+            self.geometry = geometry
+            self.layout(width, height)
+            self.layers = {}
+            self.full = True
+        if surface is not self.surface:
+            self.surface = surface
+            self.full = True
+        slots = self.visibleLayers()
+        if slots != self.slots:
+            self.slots = slots
+            self.full = True
+        background = self.getBackground(width, height)
+        if background is not self.background:
+            self.background = background
+            self.full = True
+
+        # layers which aren't visible are kept up to date too, so they're ready when scrolled to
+        rects = []
+        for cell in self.changedCells():
+            x, y, z = match.grid.coordinates(cell)
+            if y in self.layers:
+                self.drawCell(self.layers[y], x, y, z)
+            if self.full:
+                continue
+            # on wrapping boards with fewer layers than slots, a layer can be shown in more than one slot
+            for slot, layer in enumerate(self.slots):
+                if layer == y:
+                    left, top = self.origins[slot]
+                    rects.append(self.cellRect(x, z).move(left, top))
+
+        if self.full:
+            self.full = False
+            self.dirty = []
+            rect = surface.get_rect()
+            self.compose(surface, rect)
+            return [rect]
+        rects.extend(self.dirty)
+        self.dirty = []
+        for rect in rects:
+            self.compose(surface, rect)
+        return rects
@@ -0,0 +1,139 @@
+import struct
+import sys
+from array import array
+
+from engine import Engine, Player
+from ai import ComputerPlayer
+
+magic = b"3DNC"
+version = 1
+
+# magic, version, x, y, z, win_length, flags, explosion, players, winner, number of moves
+header = struct.Struct("<4sBHHHHBfHhI")
+# kind, red, green, blue, length of the utf-8 name which follows
+playerHeader = struct.Struct("<BBBBB")
+
+WRAPPING = 1
+HUMAN, COMPUTER = 0, 1
+
+
+def cellTypecode(cells):
+    """Returns the array typecode of the smallest unsigned type that can hold every cell index of a board."""
+    for typecode in ("B", "H", "I", "L"):
+        if cells <= 1 << (8 * array(typecode).itemsize):
+            return typecode
+    raise ValueError("Too many cells to save: " + str(cells))
+
+
+class Record:
+    """The settings and moves of a match, which can be written to and read from a compact binary format. The position
+    isn't stored, as it's rebuilt by replaying the moves.
+
+    Records start with a fixed size header, so the board size and winner can be read without decoding the rest, then
+    the colour, name and kind of every player, then every move as a little-endian cell index using the fewest bytes
+    the board needs."""
+
+    def __init__(self, x=3, y=3, z=3, wrapping=False, win_length=3, explosion=1, players=None, moves=None,
+                 winner=-1, computers=0):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.wrapping = wrapping
+        self.win_length = win_length
+        self.explosion = explosion
+        self.players = players if players is not None else [Player(), Player()]
+        self.moves = moves if moves is not None else []
+        self.winner = winner
+        # bitmask of the seats which were controlled by the computer
+        self.computers = computers
+
+    @classmethod
+    def fromGame(cls, game):
+        """Creates a record of an Engine, or a Match, including every move made so far."""
+        computers = 0
+        for seat, player in enumerate(game.players):
+            if isinstance(player, ComputerPlayer):
+                computers |= 1 << seat
+        return cls(game.x, game.y, game.z, game.wrapping, game.win_length, getattr(game, "explosion", 1),
+                   game.players, game.moves[:], game.winner, computers)
+
+    def encode(self):
+        # winner is -2 when a match was quit, which isn't worth keeping
+        parts = [header.pack(magic, version, self.x, self.y, self.z, self.win_length,
+                             WRAPPING if self.wrapping else 0, self.explosion, len(self.players), max(self.winner, -1),
+                             len(self.moves))]
+        for seat, player in enumerate(self.players):
+            name = player.name.encode("utf-8")[:255]
+            colour = [min(max(int(round(channel)), 0), 255) for channel in player.colour[:3]]
+            parts.append(playerHeader.pack(COMPUTER if self.computers >> seat & 1 else HUMAN, *colour, len(name)))
+            parts.append(name)
+        moves = array(cellTypecode(self.x * self.y * self.z), self.moves)
+        if sys.byteorder != "little":
+            moves.byteswap()
+        parts.append(moves.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def decode(cls, data, offset=0):
+        """Reads a record from data, which can be bytes, a memoryview or an mmap, starting at offset.
+        Returns the record and the offset just after it."""
+        fields = readHeader(data, offset)
+        record = cls(fields["x"], fields["y"], fields["z"], fields["wrapping"], fields["win_length"],
+                     round(fields["explosion"], 3), [], [], fields["winner"])
+        offset += header.size
+        for seat in range(fields["players"]):
+            kind, red, green, blue, length = playerHeader.unpack_from(data, offset)
+            offset += playerHeader.size
+            name = bytes(data[offset:offset + length]).decode("utf-8")
+            offset += length
+            record.players.append(Player((red, green, blue), name))
+            if kind == COMPUTER:
+                record.computers |= 1 << seat
+        moves = array(cellTypecode(record.x * record.y * record.z))
+        end = offset + fields["moves"] * moves.itemsize
+        if end > len(data):
+            raise ValueError("Game record is truncated")
+        moves.frombytes(bytes(data[offset:end]))
+        if sys.byteorder != "little":
+            moves.byteswap()
+        record.moves = moves.tolist()
+        return record, end
+
+    def replay(self, game, moves=None):
+        """Plays the first moves moves, or all of them, onto game, which should be a new Engine or Match with the
+        same settings. Moves go straight to the engine, so nothing is rendered. Returns game."""
+        for cell in self.moves[:moves]:
+            if not game.playCell(cell, game.currentTurn):
+                raise ValueError("Game record contains an illegal move: " + str(cell))
+        return game
+
+    def createEngine(self, moves=None, backend=None):
+        """Returns a new Engine with the position after the first moves moves, or all of them."""
+        return self.replay(Engine(self.x, self.y, self.z, self.players, self.wrapping, self.win_length, backend),
+                           moves)
+
+
+def readHeader(data, offset=0):
+    """Returns the fixed size header of the record at offset as a dict, without reading the players or moves."""
+    if len(data) - offset < header.size:
+        raise ValueError("Game record is truncated")
+    (record_magic, record_version, x, y, z, win_length, flags, explosion, players, winner,
+     moves) = header.unpack_from(data, offset)
+    if record_magic != magic:
+        raise ValueError("Not a game record")
+    if record_version != version:
+        raise ValueError("Unsupported game record version: " + str(record_version))
+    return {"x": x, "y": y, "z": z, "win_length": win_length, "wrapping": bool(flags & WRAPPING),
+            "explosion": explosion, "players": players, "winner": winner, "moves": moves}
+
+
+def save(game, path):
+    """Saves game, an Engine or a Match, to path."""
+    with open(path, "wb") as file:
+        file.write(Record.fromGame(game).encode())
+
+
+def load(path):
+    """Returns the Record saved at path. Use Record.createEngine or Record.replay to rebuild the match."""
+    with open(path, "rb") as file:
+        return Record.decode(file.read())[0]
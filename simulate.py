@@ -0,0 +1,173 @@
+"""Plays large numbers of games without a display, for gathering statistics such as the first player's win rate.
+
+Example:
+    python simulate.py --size 3x3x3 --size 4x4x4 --players 2 --players 3 --wrapping both --games 10000 -o results.jsonl
+
+Every game is written as a line of JSON as soon as it finishes, and a summary is printed at the end."""
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from engine import Engine, Player
+from ai import AlphaBetaPlayer
+from mcts import MCTSPlayer, createState
+from savegame import Record
+from archive import ArchiveWriter
+
+seatTypes = ("random", "alphabeta", "mcts")
+
+
+def createComputer(kind, time_limit, seed):
+    if kind == "alphabeta":
+        return AlphaBetaPlayer(time_limit=time_limit)
+    # workers are daemonic so can't start a pool of their own
+    return MCTSPlayer(time_limit=time_limit, processes=1, seed=seed)
+
+
+def playGame(task):
+    """Plays a single game, returning its result as a dict. Runs in worker processes, so only takes picklable
+    arguments."""
+    number, settings, seats, time_limit, seed = task
+    x, y, z, players, wrapping, win_length = settings
+    rng = random.Random(seed)
+    computers = {}
+    for seat in range(players):
+        kind = seats[seat % len(seats)]
+        if kind != "random":
+            computers[seat] = createComputer(kind, time_limit, rng.getrandbits(32))
+    if computers:
+        # computer players search from an Engine, the same as in a Match
+        state = Engine(x, y, z, players, wrapping, win_length)
+    else:
+        state = createState(settings)
+    start = time.perf_counter()
+    moves = []
+    # with only random players, picking uniformly from the cells left is the same as playing through a shuffled board
+    cells = list(range(x * y * z))
+    rng.shuffle(cells)
+    while state.winner == -1 and not state.isDraw():
+        seat = state.currentTurn
+        if seat in computers:
+            cell = computers[seat].chooseMove(state)
+        elif computers:
+            cell = rng.choice(state.legalCells())
+        else:
+            cell = cells.pop()
+        state.playCell(cell, seat)
+        moves.append(cell)
+    for computer in computers.values():
+        computer.close()
+    return {"game": number, "x": x, "y": y, "z": z, "players": players, "wrapping": wrapping,
+            "win_length": win_length, "seats": [seats[seat % len(seats)] for seat in range(players)],
+            "winner": state.winner, "moves": moves, "time": time.perf_counter() - start}
+
+
+def createRecord(game):
+    """Converts a result from playGame into a savegame.Record."""
+    computers = sum(1 << seat for seat, kind in enumerate(game["seats"]) if kind != "random")
+    return Record(game["x"], game["y"], game["z"], game["wrapping"], game["win_length"], 1,
+                  [Player(name=kind) for kind in game["seats"]], game["moves"], game["winner"], computers)
+
+
+def parseSize(text):
+    sizes = [int(part) for part in text.lower().split("x")]
+    if len(sizes) == 1:
+        sizes *= 3
+    if len(sizes) != 3 or min(sizes) < 1:
+        raise argparse.ArgumentTypeError("sizes are given as XxYxZ, or a single number for a cube")
+    return tuple(sizes)
+
+
+def createTasks(args):
+    rng = random.Random(args.seed)
+    wrapping = {"off": [False], "on": [True], "both": [False, True]}[args.wrapping]
+    number = 0
+    for size in args.size or [(3, 3, 3)]:
+        for players in args.players or [2]:
+            for wraps in wrapping:
+                settings = size + (players, wraps, args.line)
+                for i in range(args.games):
+                    yield number, settings, args.seats, args.time_limit, rng.getrandbits(32)
+                    number += 1
+
+
+def printSummary(results, moves, elapsed, out):
+    """Prints throughput and a table of win rates for each board setting. results maps each setting to the number of
+    wins for each player, followed by the number of draws."""
+    games = sum(sum(counts) for counts in results.values())
+    elapsed = max(elapsed, 1e-9)
+    print("{} games, {} moves in {:.2f}s: {:.1f} games/s, {:.1f} moves/s".format(
+        games, moves, elapsed, games / elapsed, moves / elapsed), file=out)
+    print(file=out)
+    most = max([key[1] for key in results] or [0])
+    header = "{:<10} {:>7} {:>8} {:>7} {:>7}".format("Size", "Players", "Wrapping", "Games", "Draws")
+    header += "".join(" {:>7}".format("P" + str(seat + 1)) for seat in range(most))
+    print(header, file=out)
+    for key in sorted(results):
+        size, players, wrapping = key
+        wins = results[key][:-1]
+        draws = results[key][-1]
+        games = sum(results[key])
+        row = "{:<10} {:>7} {:>8} {:>7} {:>6.1%}".format(
+            "x".join(str(side) for side in size), players, "on" if wrapping else "off", games, draws / games)
+        row += "".join(" {:>6.1%}".format(win / games) for win in wins)
+        print(row, file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plays games without a display and reports statistics.")
+    parser.add_argument("--size", type=parseSize, action="append",
+                        help="board size as XxYxZ, can be given more than once (default 3x3x3)")
+    parser.add_argument("--players", type=int, action="append",
+                        help="number of players, can be given more than once (default 2)")
+    parser.add_argument("--wrapping", choices=("off", "on", "both"), default="off")
+    parser.add_argument("--line", type=int, default=3, help="markers in a row needed to win")
+    parser.add_argument("--games", type=int, default=1000, help="games to play for each setting")
+    parser.add_argument("--seats", type=lambda text: text.split(","), default=["random"],
+                        help="comma separated player types from " + ", ".join(seatTypes) +
+                             ", repeated to fill every seat (default random)")
+    parser.add_argument("--time-limit", type=float, default=0.1, help="seconds a computer player takes per move")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default one per core)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("-o", "--output", default="-", help="file to write JSON Lines results to (default stdout)")
+    parser.add_argument("--archive", default=None, help="game archive to add every game to, see archive.py")
+    args = parser.parse_args(argv)
+    for kind in args.seats:
+        if kind not in seatTypes:
+            parser.error("unknown player type: " + kind)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    # keep the summary out of the results when they're written to stdout
+    report = sys.stderr if out is sys.stdout else sys.stdout
+    archive = ArchiveWriter(args.archive) if args.archive else None
+    results = {}
+    moves = 0
+    start = time.perf_counter()
+    processes = args.processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes) if processes > 1 else None
+    try:
+        tasks = createTasks(args)
+        games = pool.imap_unordered(playGame, tasks, 16) if pool is not None else map(playGame, tasks)
+        for game in games:
+            out.write(json.dumps(game) + "\n")
+            if archive is not None:
+                archive.append(createRecord(game))
+            key = ((game["x"], game["y"], game["z"]), game["players"], game["wrapping"])
+            # a draw's winner of -1 counts it in the last slot
+            results.setdefault(key, [0] * (game["players"] + 1))[game["winner"]] += 1
+            moves += len(game["moves"])
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if out is not sys.stdout:
+            out.close()
+        if archive is not None:
+            archive.close()
+    printSummary(results, moves, time.perf_counter() - start, report)
+
+
+if __name__ == "__main__":
+    main()
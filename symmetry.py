@@ -0,0 +1,140 @@
+import itertools
+from collections import OrderedDict
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# largest number of entries (symmetries * cells) to build when adding translations on wrapping boards
+translationLimit = 1000000
+
+# symmetry tables shared between caches, keyed on (x, y, z, wrapping)
+tables = {}
+
+
+def boardSymmetries(x, y, z, wrapping=False):
+    """Returns a list of every distinct symmetry of the board as a cell permutation, where perm[new] is the cell that
+    moves to new. Covers the 48 rotations and reflections of a cube (fewer for boards with unequal sides) and, on
+    wrapping boards, every translation as long as that keeps the table below translationLimit."""
+    size = (x, y, z)
+    cells = x * y * z
+    if wrapping and 48 * cells * cells <= translationLimit:
+        shifts = list(itertools.product(range(x), range(y), range(z)))
+    else:
+        shifts = [(0, 0, 0)]
+    perms = []
+    seen = set()
+    for axes in itertools.permutations(range(3)):
+        # axes can only be swapped if they're the same length
+        if any(size[axes[i]] != size[i] for i in range(3)):
+            continue
+        for flips in itertools.product((False, True), repeat=3):
+            for shift in shifts:
+                perm = []
+                for new in itertools.product(range(x), range(y), range(z)):
+                    old = [0, 0, 0]
+                    for i in range(3):
+                        coordinate = (new[i] + shift[i]) % size[i]
+                        if flips[i]:
+                            coordinate = size[i] - 1 - coordinate
+                        old[axes[i]] = coordinate
+                    perm.append((old[0] * y + old[1]) * z + old[2])
+                perm = tuple(perm)
+                if perm not in seen:
+                    seen.add(perm)
+                    perms.append(perm)
+    return perms
+
+
+class SymmetryTable:
+    """Every symmetry of a board, along with their inverses for mapping moves in and out of canonical form."""
+
+    def __init__(self, x, y, z, wrapping=False):
+        self.perms = boardSymmetries(x, y, z, wrapping)
+        self.inverses = []
+        for perm in self.perms:
+            inverse = [0] * len(perm)
+            for new, old in enumerate(perm):
+                inverse[old] = new
+            self.inverses.append(inverse)
+        if numpy is not None:
+            self.array = numpy.array(self.perms, dtype=numpy.intp)
+
+    def canonical(self, owners):
+        """Returns (key, symmetry) for the smallest transformation of owners, which lists the player in every cell.
+        Symmetric positions always give the same key."""
+        if numpy is not None:
+            rows = numpy.asarray(owners, dtype=numpy.int16)[self.array]
+            # lexsort treats the last key as most significant, so reverse the columns
+            best = int(numpy.lexsort(rows.T[::-1])[0])
+            return rows[best].tobytes(), best
+        best = min(range(len(self.perms)), key=lambda i: [owners[old] for old in self.perms[i]])
+        return tuple(owners[old] for old in self.perms[best]), best
+
+    def toCanonical(self, cell, symmetry):
+        """Converts a cell from the original position into the canonical position given by symmetry."""
+        return self.inverses[symmetry][cell]
+
+    def fromCanonical(self, cell, symmetry):
+        """Converts a cell from the canonical position given by symmetry back into the original position."""
+        return self.perms[symmetry][cell]
+
+
+def symmetryTable(x, y, z, wrapping=False):
+    key = (x, y, z, wrapping)
+    if key not in tables:
+        tables[key] = SymmetryTable(x, y, z, wrapping)
+    return tables[key]
+
+
+class PositionCache:
+    """An LRU cache keyed on the canonical form of a position, so a result stored for one position is found again for
+    all of its symmetric positions. Can be shared by any number of players and solvers, as keys include the board
+    settings. Any cells stored in values should be converted with toCanonical and fromCanonical."""
+
+    def __init__(self, size=1 << 16):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, state, *extra):
+        """Returns (key, symmetry) for an Engine or BitboardEngine. extra is added to the key, for values that
+        depend on more than the position (e.g. which player they're scored for)."""
+        table = symmetryTable(state.x, state.y, state.z, state.wrapping)
+        canonical, symmetry = table.canonical(state.owners())
+        settings = (state.x, state.y, state.z, state.wrapping, state.win_length, len(state.players))
+        return (settings, state.currentTurn, canonical) + extra, symmetry
+
+    def toCanonical(self, state, cell, symmetry):
+        return symmetryTable(state.x, state.y, state.z, state.wrapping).toCanonical(cell, symmetry)
+
+    def fromCanonical(self, state, cell, symmetry):
+        return symmetryTable(state.x, state.y, state.z, state.wrapping).fromCanonical(cell, symmetry)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return entry
+
+    def store(self, key, value):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+        elif len(self.entries) >= self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        self.entries[key] = value
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0}
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,57 @@
+import math
+import os
+import sys
+import unittest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pygame
+
+import render
+from vector import Position3d, Rotation3d
+
+
+class CullingTest(unittest.TestCase):
+    width, height = 800, 600
+
+    def setUp(self):
+        self.camera = render.Camera(width=self.width, height=self.height, zoom=8)
+        self.screen = pygame.Surface((self.width, self.height))
+
+    def cube(self, side, margin):
+        """Returns a cube whose bounding sphere is margin beyond the side ("x" or "y") edge of the screen, so it
+        overlaps the screen when margin is negative."""
+        camera = self.camera
+        cube = render.Cuboid(Position3d(0, 0, 0), Position3d(1, 1, 1), Rotation3d(0, 0, 0))
+        depth = 10
+        # the edge of the screen is at half of the fov's slope
+        slope = (camera.hfov if side == "x" else camera.vfov) / 2
+        # the distance from the plane through the camera and the edge to a point is its offset from the edge scaled
+        # by this
+        across = depth * slope + (cube.radius + margin) * math.sqrt(1 + slope * slope)
+        axis = camera.xaxis if side == "x" else camera.yaxis
+        cube.position = camera.position + camera.zaxis * depth + axis * across
+        return cube
+
+    def assertCulled(self, cube, culled):
+        self.assertEqual(self.camera.inView(cube.position, cube.radius), not culled)
+        for vectorised in (True, False):
+            self.camera.vectorised = vectorised
+            self.camera.render(self.screen, [cube], self.width, self.height)
+            self.assertEqual(self.camera.lastFrame["culled_objects"], int(culled))
+            self.assertEqual(self.camera.lastFrame["objects"], int(not culled))
+
+    def testJustOutsideEdgeIsCulled(self):
+        for side in ("x", "y"):
+            with self.subTest(side=side):
+                self.assertCulled(self.cube(side, 0.01), True)
+
+    def testJustInsideEdgeIsDrawn(self):
+        for side in ("x", "y"):
+            with self.subTest(side=side):
+                self.assertCulled(self.cube(side, -0.01), False)
+
+
+if __name__ == "__main__":
+    unittest.main()
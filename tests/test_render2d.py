@@ -0,0 +1,46 @@
+import importlib.util
+import os
+import sys
+import unittest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, root)
+
+import pygame
+
+from render2d import SideBySideView
+
+# the game script's name isn't a valid module name, so it's loaded from its path
+spec = importlib.util.spec_from_file_location("game", os.path.join(root, "3dNaughtsAndCrosses.py"))
+game = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(game)
+
+
+class SideBySideTest(unittest.TestCase):
+    width, height = 600, 200
+
+    def assertMatchesFullRedraw(self, match, surface):
+        expected = pygame.Surface((self.width, self.height))
+        SideBySideView(match).draw(expected)
+        self.assertEqual(pygame.image.tobytes(surface, "RGB"), pygame.image.tobytes(expected, "RGB"))
+
+    def testRepeatedLayersOnWrappingBoard(self):
+        # with one layer and three slots, every slot shows layer 0, so each change has to be redrawn in all of them
+        match = game.Match(3, 1, 3, 1, game.createPlayers(2, 0), True, True, 3)
+        match.start()
+        self.assertLess(match.y, match.zoom2d)
+        view = SideBySideView(match)
+        surface = pygame.Surface((self.width, self.height))
+        view.draw(surface)
+        for direction in ("Right", "Forward"):
+            match.moveSelection(direction)
+            view.draw(surface)
+            self.assertMatchesFullRedraw(match, surface)
+        match.playCell(match.grid.index(2, 0, 2), match.currentTurn)
+        view.draw(surface)
+        self.assertMatchesFullRedraw(match, surface)
+
+
+if __name__ == "__main__":
+    unittest.main()
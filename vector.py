@@ -0,0 +1,205 @@
+import math
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1024)
+def rotationMatrix(x, y, z):
+    # returns the matrix for an Euler angles rotation in the order X->Y->Z as a flat row-major tuple. Cached, since
+    # the same rotation is usually applied to many vectors
+    cx, sx = math.cos(x), math.sin(x)
+    cy, sy = math.cos(y), math.sin(y)
+    cz, sz = math.cos(z), math.sin(z)
+    return (cz * cy, cz * -sy * sx - sz * cx, cz * -sy * cx + sz * sx,
+            sz * cy, sz * -sy * sx + cz * cx, sz * -sy * cx - cz * sx,
+            sy, cy * sx, cy * cx)
+
+
+class Vector3d:
+    # slots avoid a __dict__ per vector, making them smaller and quicker to create. Arithmetic always returns a plain
+    # Vector3d, and the in-place operators modify the vector rather than creating a new one, so be careful with
+    # vectors which are shared.
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    def clone(self):
+        return __class__(self.x, self.y, self.z)
+
+    # other is either a vector or a number, which only takes one type check to tell apart
+    def __add__(self, other):
+        if isinstance(other, Vector3d):
+            return Vector3d(self.x + other.x, self.y + other.y, self.z + other.z)
+        return Vector3d(self.x + other, self.y + other, self.z + other)
+
+    def __sub__(self, other):
+        if isinstance(other, Vector3d):
+            return Vector3d(self.x - other.x, self.y - other.y, self.z - other.z)
+        return Vector3d(self.x - other, self.y - other, self.z - other)
+
+    def __mul__(self, other):
+        if isinstance(other, Vector3d):
+            return Vector3d(self.x * other.x, self.y * other.y, self.z * other.z)
+        return Vector3d(self.x * other, self.y * other, self.z * other)
+
+    def __truediv__(self, other):
+        if isinstance(other, Vector3d):
+            return Vector3d(self.x / other.x, self.y / other.y, self.z / other.z)
+        return Vector3d(self.x / other, self.y / other, self.z / other)
+
+    def __iadd__(self, other):
+        if isinstance(other, Vector3d):
+            self.x += other.x
+            self.y += other.y
+            self.z += other.z
+        else:
+            self.x += other
+            self.y += other
+            self.z += other
+        return self
+
+    def __isub__(self, other):
+        if isinstance(other, Vector3d):
+            self.x -= other.x
+            self.y -= other.y
+            self.z -= other.z
+        else:
+            self.x -= other
+            self.y -= other
+            self.z -= other
+        return self
+
+    def __imul__(self, other):
+        if isinstance(other, Vector3d):
+            self.x *= other.x
+            self.y *= other.y
+            self.z *= other.z
+        else:
+            self.x *= other
+            self.y *= other
+            self.z *= other
+        return self
+
+    def __itruediv__(self, other):
+        if isinstance(other, Vector3d):
+            self.x /= other.x
+            self.y /= other.y
+            self.z /= other.z
+        else:
+            self.x /= other
+            self.y /= other
+            self.z /= other
+        return self
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return self.x == other.x and self.y == other.y and self.z == other.z
+
+    def __str__(self):
+        return str(round(self.x * 1000) / 1000) + ", " + str(round(self.y * 1000) / 1000) + ", " + str(
+            round(self.z * 1000) / 1000)
+
+    def magnitude(self):
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def dotProduct(self, vector):
+        return self.x * vector.x + self.y * vector.y + self.z * vector.z
+
+    def angleBetween(self, other):
+        # returns the angle in radians between two vectors using u.v = |u| * |v| * cos\theta
+        # guaranteed to be <=pi
+        denom = self.magnitude() * other.magnitude()
+        numer = self.dotProduct(other)
+        return math.acos(numer / denom)
+
+    def rotateX(self, theta, return_new=False):
+        # performs a rotation of theta radians along the x-axis
+        # applies the rotation to the current vector, unless return_new == True
+        cos, sin = math.cos(theta), math.sin(theta)
+        y = self.y * cos - self.z * sin
+        z = self.z * cos + self.y * sin
+        if return_new:
+            return __class__(self.x, y, z)
+        else:
+            self.y, self.z = y, z
+
+    def rotateY(self, theta, return_new=False):
+        # performs a rotation of theta radians along the y-axis
+        # applies the rotation to the current vector, unless return_new == True
+        cos, sin = math.cos(theta), math.sin(theta)
+        x = self.x * cos - self.z * sin
+        z = self.z * cos + self.x * sin
+        if return_new:
+            return __class__(x, self.y, z)
+        else:
+            self.x, self.z = x, z
+
+    def rotateZ(self, theta, return_new=False):
+        # performs a rotation of theta radians along the z-axis
+        # applies the rotation to the current vector, unless return_new == True
+        cos, sin = math.cos(theta), math.sin(theta)
+        x = self.x * cos - self.y * sin
+        y = self.y * cos + self.x * sin
+        if return_new:
+            return __class__(x, y, self.z)
+        else:
+            self.x, self.y = x, y
+
+    def transform(self, m):
+        # multiplies the vector in place by m, a flat row-major 3x3 matrix such as one from rotationMatrix
+        x, y, z = self.x, self.y, self.z
+        self.x = m[0] * x + m[1] * y + m[2] * z
+        self.y = m[3] * x + m[4] * y + m[5] * z
+        self.z = m[6] * x + m[7] * y + m[8] * z
+        return self
+
+    def modifyAxes(self, rotation):
+        # applies a Euler angles rotation in the order X->Y->Z
+        return self.transform(rotationMatrix(rotation.x, rotation.y, rotation.z))
+
+
+class Rotation3d(Vector3d):
+    # A vector storing a Euler angles rotation
+    __slots__ = ()
+
+    def __init__(self, x, y, z, radians=False):
+        if radians:
+            super().__init__(x, y, z)
+        else:
+            self.update(x, y, z, False)
+
+    def update(self, x, y, z, radians=False):
+        # sets the vector's angles in degrees unless radians == True
+        if radians:
+            self.x = x
+            self.y = y
+            self.z = z
+        else:
+            self.x = math.radians(x)
+            self.y = math.radians(y)
+            self.z = math.radians(z)
+
+    def normalise(self):
+        # normalises all angles to be below 2pi
+        if self.x > 2 * math.pi:
+            self.x -= 2 * math.pi
+        elif self.x < 0:
+            self.x += 2 * math.pi
+        if self.y > 2 * math.pi:
+            self.y -= 2 * math.pi
+        elif self.y < 0:
+            self.y += 2 * math.pi
+        if self.z > 2 * math.pi:
+            self.z -= 2 * math.pi
+        elif self.z < 0:
+            self.z += 2 * math.pi
+
+
+class Position3d(Vector3d):
+    __slots__ = ()
+
+    def getDistance(self, otherPosition):
+        return (self - otherPosition).magnitude()